@@ -1,10 +1,13 @@
 import React, { useState, useEffect, useMemo } from "react";
-import axios from "axios";
 import { motion } from "framer-motion";
 import { ChevronLeft, ChevronRight, Search } from "lucide-react";
 import styles from "./LiveStocks.module.css";
 
-const BASE_URL = "http://localhost:8000/api/crypto/top20";
+const PRICES_URL = "ws://localhost:8000/ws/prices";
+const RECONNECT_BASE_MS = 1000;
+const RECONNECT_MAX_MS = 30000;
+// A single dropped connection reconnects silently, the error shows only if it keeps failing
+const FAILURES_BEFORE_ERROR = 3;
 
 function CryptoList() {
   const [allCryptos, setAllCryptos] = useState([]);
@@ -15,36 +18,58 @@ function CryptoList() {
   const itemsPerPage = 20;
 
   useEffect(() => {
-    const fetchData = async () => {
-      setLoading(true);
-      try {
-        const response = await axios.get(
-          "https://api.coingecko.com/api/v3/coins/markets",
-          {
-            params: {
-              vs_currency: "usd",
-              order: "market_cap_desc",
-              per_page: 100,
-              page: 1,
-              sparkline: false,
-            },
-          }
-        );
-        setAllCryptos(response.data || []);
+    let socket;
+    let retryTimer;
+    let failures = 0;
+    let stopped = false;
+
+    // One snapshot, then only the quotes that changed on each server-side refresh
+    const connect = () => {
+      socket = new WebSocket(PRICES_URL);
 
-        try {
-          await axios.get(`${BASE_URL}?vs_currency=usd&sync=true`);
-        } catch (syncError) {
-          console.log("Sync to backend failed");
+      socket.onopen = () => {
+        failures = 0;
+        setError("");
+      };
+
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === "snapshot") {
+          if (message.quotes.length > 0) {
+            setAllCryptos(message.quotes);
+            setLoading(false);
+          }
+          return;
         }
-      } catch (err) {
-        setError(err.response?.data?.detail || "Failed to fetch data");
-      } finally {
+        setAllCryptos((current) => {
+          if (current.length === 0) return message.quotes;
+          const changed = new Map(message.quotes.map((quote) => [quote.id, quote]));
+          return current.map((quote) => changed.get(quote.id) || quote);
+        });
         setLoading(false);
-      }
+      };
+
+      // Also fires after onerror, and when the server drops a client that fell behind.
+      // Reconnect with backoff, the snapshot on reconnect catches up on missed updates.
+      socket.onclose = () => {
+        if (stopped) return;
+        failures += 1;
+        if (failures >= FAILURES_BEFORE_ERROR) {
+          setError("Failed to fetch data");
+          setLoading(false);
+        }
+        const delay = Math.min(RECONNECT_BASE_MS * 2 ** (failures - 1), RECONNECT_MAX_MS);
+        retryTimer = setTimeout(connect, delay);
+      };
     };
 
-    fetchData();
+    connect();
+
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      socket.close();
+    };
   }, []);
 
   // Filter based on search query
@@ -19,22 +19,13 @@ const Portfolio = () => {
 
       setLoading(true);
       try {
-        // Fetch user info (holdings, balance)
-        const userRes = await axios.get(`http://localhost:8000/users/${user.username}`);
-        setUserData(userRes.data);
-
-        // Fetch user transactions
-        try {
-          const transRes = await axios.get(`http://localhost:8000/transactions/${user.username}`);
-          setTransactions(transRes.data || []);
-        } catch (transErr) {
-          // If 404, it just means no transactions yet, which is fine
-          if (transErr.response?.status === 404) {
-            setTransactions([]);
-          } else {
-            throw transErr;
-          }
-        }
+        // Valued holdings, balance and trade count, computed server-side
+        const portfolioRes = await axios.get(`http://localhost:8000/users/${user.username}/portfolio`);
+        setUserData(portfolioRes.data);
+
+        // Only the first page of history is shown here
+        const transRes = await axios.get(`http://localhost:8000/transactions/${user.username}`, { params: { limit: 5 } });
+        setTransactions(transRes.data || []);
       } catch (err) {
         setError("Failed to load portfolio data");
         console.error(err);
@@ -59,7 +50,7 @@ const Portfolio = () => {
 
   if (loading) return <div className={styles.container}><p style={{ textAlign: "center" }}>Loading your portfolio...</p></div>;
 
-  const totalTrades = transactions.length;
+  const totalTrades = userData?.trade_count ?? 0;
 
   return (
     <motion.div
@@ -95,6 +86,16 @@ const Portfolio = () => {
             <p className={styles.statValue}>${userData?.balance?.toLocaleString(undefined, { minimumFractionDigits: 2 })}</p>
           </div>
         </div>
+
+        <div className={styles.statBox}>
+          <div className={styles.statIcon} style={{ background: "rgba(0, 229, 255, 0.1)", color: "var(--accent-buy)" }}>
+            <TrendingUp size={24} />
+          </div>
+          <div className={styles.statContent}>
+            <p className={styles.statLabel}>Total Equity</p>
+            <p className={styles.statValue}>${userData?.total_equity?.toLocaleString(undefined, { minimumFractionDigits: 2 })}</p>
+          </div>
+        </div>
       </div>
 
       {/* Holdings Section */}
@@ -104,19 +105,21 @@ const Portfolio = () => {
       </div>
 
       <div className={styles.stockGrid}>
-        {userData?.holdings && Object.keys(userData.holdings).length > 0 ? (
-          Object.entries(userData.holdings).map(([ticker, amount]) => (
-            amount > 0 && (
-              <div key={ticker} className={styles.stockItem}>
-                <div className={styles.coinHeader}>
-                  <h3>{ticker}</h3>
-                </div>
-                <p className={styles.ticker}>{amount.toLocaleString()} Units</p>
-                <div className={styles.holdingsAction}>
-                  <Link to={`/stock/${ticker}`} className={styles.detailsBtn}>View Asset</Link>
-                </div>
+        {userData?.holdings?.length > 0 ? (
+          userData.holdings.map((holding) => (
+            <div key={holding.ticker} className={styles.stockItem}>
+              <div className={styles.coinHeader}>
+                <h3>{holding.ticker}</h3>
               </div>
-            )
+              <p className={styles.ticker}>{holding.quantity.toLocaleString()} Units</p>
+              <p className={styles.ticker}>
+                ${holding.market_value.toLocaleString(undefined, { minimumFractionDigits: 2 })}
+                {" "}(avg ${holding.average_cost.toLocaleString(undefined, { minimumFractionDigits: 2 })})
+              </p>
+              <div className={styles.holdingsAction}>
+                <Link to={`/stock/${holding.ticker}`} className={styles.detailsBtn}>View Asset</Link>
+              </div>
+            </div>
           ))
         ) : (
           <p className={styles.emptyText}>No assets held currently</p>
@@ -131,7 +134,7 @@ const Portfolio = () => {
 
       <div className={styles.transList}>
         {transactions.length > 0 ? (
-          transactions.slice(0, 5).map((trans, idx) => (
+          transactions.map((trans, idx) => (
             <div key={idx} className={styles.transItem}>
               <div className={styles.transLeft}>
                 <span className={trans.transaction_type === "BUY" ? styles.buyTag : styles.sellTag}>
@@ -150,7 +153,7 @@ const Portfolio = () => {
         ) : (
           <p className={styles.emptyText}>No transactions yet</p>
         )}
-        {transactions.length > 5 && (
+        {totalTrades > 5 && (
           <Link to={`/transactions/${user.username}`} className={styles.viewMore}>View all transactions</Link>
         )}
       </div>
@@ -12,7 +12,8 @@ const TransactionFilter = () => {
   const handleFilter = async () => {
     try {
       const response = await axios.get(
-        `http://localhost:8000/transactions/${username}/by-date`
+        `http://localhost:8000/transactions/${username}/range`,
+        { params: { start: startTime || undefined, end: endTime || undefined } }
       );
       setTransactions(response.data);
       setMessage("");
@@ -0,0 +1,54 @@
+"""Add positions table
+
+Revision ID: 3f1a9c2b7d40
+Revises: c85ac7637d6b
+Create Date: 2026-10-17 10:02:11.412377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2b7d40'
+down_revision: Union[str, None] = 'c85ac7637d6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('positions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('stock_id', sa.Integer(), nullable=False),
+    sa.Column('net_volume', sa.Float(), nullable=False),
+    sa.Column('cost_basis', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'stock_id', name='uq_positions_user_stock')
+    )
+    # Backfill from the ledger in one set-based pass, valuing what is still held at the average
+    # buy price. Replaying every trade in order gives the exact average cost after partial
+    # closes: python -m backend.scripts.rebuild_positions
+    op.execute("""
+        INSERT INTO positions (user_id, stock_id, net_volume, cost_basis)
+        SELECT user_id, ticker_id,
+               CASE WHEN net_volume > 0 THEN net_volume ELSE 0 END,
+               CASE WHEN net_volume > 0 THEN bought_notional / bought_volume * net_volume ELSE 0 END
+        FROM (
+            SELECT user_id, ticker_id,
+                   SUM(CASE WHEN UPPER(transaction_type) = 'BUY' THEN transaction_volume
+                            ELSE -transaction_volume END) AS net_volume,
+                   SUM(CASE WHEN UPPER(transaction_type) = 'BUY' THEN transaction_volume ELSE 0 END) AS bought_volume,
+                   SUM(CASE WHEN UPPER(transaction_type) = 'BUY' THEN transaction_price ELSE 0 END) AS bought_notional
+            FROM transactions
+            GROUP BY user_id, ticker_id
+        ) AS totals
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('positions')
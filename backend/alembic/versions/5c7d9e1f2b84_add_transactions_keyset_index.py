@@ -0,0 +1,27 @@
+"""Add (user_id, id) index for keyset pagination
+
+Revision ID: 5c7d9e1f2b84
+Revises: 8b2e4d6f1a93
+Create Date: 2026-10-17 14:37:20.551903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7d9e1f2b84'
+down_revision: Union[str, None] = '8b2e4d6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lets GET /transactions/{username}?cursor=... seek straight to the next page
+    op.create_index('ix_transactions_user_id_id', 'transactions', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_user_id_id', table_name='transactions')
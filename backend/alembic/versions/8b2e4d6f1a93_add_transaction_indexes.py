@@ -0,0 +1,34 @@
+"""Add indexes for transactions hot paths
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f1a9c2b7d40
+Create Date: 2026-10-17 11:24:53.108412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a93'
+down_revision: Union[str, None] = '3f1a9c2b7d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (user_id, ticker_id) serves per-user/per-ticker lookups, and its user_id
+    # prefix covers the user_id foreign key and plain per-user history scans.
+    op.create_index('ix_transactions_user_id_ticker_id', 'transactions', ['user_id', 'ticker_id'], unique=False)
+    op.create_index('ix_transactions_user_id_created_time', 'transactions', ['user_id', 'created_time'], unique=False)
+    op.create_index('ix_transactions_ticker_id', 'transactions', ['ticker_id'], unique=False)
+    op.create_index('ix_positions_stock_id', 'positions', ['stock_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_positions_stock_id', table_name='positions')
+    op.drop_index('ix_transactions_ticker_id', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_created_time', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_ticker_id', table_name='transactions')
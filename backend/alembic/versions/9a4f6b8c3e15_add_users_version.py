@@ -0,0 +1,26 @@
+"""Add users.version for optimistic locking
+
+Revision ID: 9a4f6b8c3e15
+Revises: 5c7d9e1f2b84
+Create Date: 2026-10-17 16:05:42.730118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f6b8c3e15'
+down_revision: Union[str, None] = '5c7d9e1f2b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'version')
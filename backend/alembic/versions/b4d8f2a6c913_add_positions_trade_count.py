@@ -0,0 +1,32 @@
+"""Add positions.trade_count
+
+Revision ID: b4d8f2a6c913
+Revises: e7c3a5f9b2d6
+Create Date: 2026-10-17 19:31:48.117206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d8f2a6c913'
+down_revision: Union[str, None] = 'e7c3a5f9b2d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('positions', sa.Column('trade_count', sa.Integer(), server_default='0', nullable=False))
+    # One pass over the ledger, served by ix_transactions_user_id_ticker_id
+    op.execute(
+        "UPDATE positions SET trade_count = ("
+        "SELECT COUNT(*) FROM transactions "
+        "WHERE transactions.user_id = positions.user_id AND transactions.ticker_id = positions.stock_id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('positions', 'trade_count')
@@ -0,0 +1,43 @@
+"""Add lots table and positions.realized_pnl
+
+Revision ID: d2b6e8a4c7f1
+Revises: 9a4f6b8c3e15
+Create Date: 2026-10-17 18:12:37.581904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b6e8a4c7f1'
+down_revision: Union[str, None] = '9a4f6b8c3e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('lots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('stock_id', sa.Integer(), nullable=False),
+    sa.Column('volume', sa.Float(), nullable=False),
+    sa.Column('remaining_volume', sa.Float(), nullable=False),
+    sa.Column('unit_cost', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['stock_id'], ['stocks.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_lots_open', 'lots', ['user_id', 'stock_id', 'id'], unique=False,
+                    postgresql_where=sa.text('remaining_volume > 0'),
+                    sqlite_where=sa.text('remaining_volume > 0'))
+    op.add_column('positions', sa.Column('realized_pnl', sa.Float(), server_default='0', nullable=False))
+    # Existing ledgers are backfilled with: python -m backend.scripts.rebuild_positions
+
+
+def downgrade() -> None:
+    op.drop_column('positions', 'realized_pnl')
+    op.drop_index('ix_lots_open', table_name='lots')
+    op.drop_table('lots')
@@ -0,0 +1,52 @@
+"""Add ingestion_runs and ingestion_quotes tables
+
+Revision ID: e7c3a5f9b2d6
+Revises: d2b6e8a4c7f1
+Create Date: 2026-10-17 18:45:10.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a5f9b2d6'
+down_revision: Union[str, None] = 'd2b6e8a4c7f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ingestion_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vs_currency', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('pages', sa.Integer(), nullable=False),
+    sa.Column('pages_failed', sa.Integer(), nullable=False),
+    sa.Column('coins', sa.Integer(), nullable=False),
+    sa.Column('inserted', sa.Integer(), nullable=False),
+    sa.Column('updated', sa.Integer(), nullable=False),
+    sa.Column('unchanged', sa.Integer(), nullable=False),
+    sa.Column('started_time', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finished_time', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('ingestion_quotes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('symbol', sa.String(length=10), nullable=True),
+    sa.Column('name', sa.String(length=40), nullable=True),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['run_id'], ['ingestion_runs.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ingestion_quotes_run_id_rank', 'ingestion_quotes', ['run_id', 'rank'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ingestion_quotes_run_id_rank', table_name='ingestion_quotes')
+    op.drop_table('ingestion_quotes')
+    op.drop_table('ingestion_runs')
@@ -0,0 +1,79 @@
+"""
+Counts SQL statements per authenticated request with the principal cache warm
+and with it cleared before every request, to show the queries the cache saves.
+
+    python -m backend.benchmarks.auth_queries --requests 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+ENDPOINTS = ["/users/bench", "/transactions/bench?limit=50", "/transactions/bench/range?group_by=ticker"]
+
+
+def seed():
+    from sqlalchemy import text
+    from backend.database.db import Base, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, hashed_password, balance) VALUES (1, 'bench', 'x', 100)"))
+        conn.execute(text("INSERT INTO stocks (id, ticker, stock_price, stock_name) VALUES (1, 'BTC', 1, 'Bitcoin')"))
+        conn.execute(text("INSERT INTO positions (user_id, stock_id, net_volume, cost_basis) VALUES (1, 1, 10, 10)"))
+        conn.execute(
+            text("INSERT INTO transactions (user_id, ticker_id, transaction_type, transaction_volume, "
+                 "transaction_price, created_time) VALUES (1, 1, 'BUY', 1, 1, CURRENT_TIMESTAMP)"),
+            [{} for _ in range(10)]
+        )
+
+
+def run(requests: int) -> dict:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from backend.common.security import create_access_token, principal_cache
+    from backend.database.db import async_engine
+    from backend.scripts.run import app
+
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(1))
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+
+    report = {}
+    with TestClient(app) as client:
+        for endpoint in ENDPOINTS:
+            results = {}
+            for mode in ("cold", "warm"):
+                principal_cache.clear()
+                statements.clear()
+                for _ in range(requests):
+                    if mode == "cold":
+                        principal_cache.clear()
+                    client.get(endpoint, headers=headers).raise_for_status()
+                results[f"{mode}_queries_per_request"] = round(len(statements) / requests, 3)
+            results["queries_saved_per_request"] = round(
+                results["cold_queries_per_request"] - results["warm_queries_per_request"], 3
+            )
+            report[endpoint] = results
+    report["principal_cache"] = principal_cache.info()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL statements per request with and without the principal cache.")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["PRICE_REFRESH_ENABLED"] = "false"
+    import backend.models  # noqa: F401  Register all models before create_all
+
+    seed()
+    json.dump(run(args.requests), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Fires concurrent fetch_crypto_data calls at a local stub upstream after the
+cache is cleared, and reports how many upstream requests they caused.
+
+    python -m backend.benchmarks.coingecko_client --callers 200 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from backend.benchmarks.stub_coingecko import StubCoinGecko
+
+
+async def run(callers: int, rounds: int) -> dict:
+    from backend.common.coingecko import coingecko_client
+    from backend.routes.stock_routes import CACHE, fetch_crypto_data
+
+    timings = []
+    try:
+        for _ in range(rounds):
+            # Simulate the cache expiring under load
+            CACHE.clear()
+            started = time.perf_counter()
+            await asyncio.gather(*(fetch_crypto_data("usd", count=100) for _ in range(callers)))
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        await coingecko_client.aclose()
+    return {"round_ms": [round(t, 2) for t in timings], "client_upstream_requests": coingecko_client.upstream_requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-flight CoinGecko client benchmark.")
+    parser.add_argument("--callers", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.1, help="Stub upstream delay in seconds")
+    args = parser.parse_args()
+
+    stub = StubCoinGecko(latency=args.latency).start()
+    from backend.common.coingecko import coingecko_client
+    coingecko_client.base_url = stub.base_url
+    try:
+        report = asyncio.run(run(args.callers, args.rounds))
+    finally:
+        stub.stop()
+
+    report.update({"callers": args.callers, "rounds": args.rounds, "stub_requests": stub.requests})
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Times full and conditional (If-None-Match) requests to /getstocks/ through the ASGI app,
+and counts the SQL statements each kind issues.
+
+    python -m backend.benchmarks.conditional_get --stocks 2000 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+
+def seed(stocks: int):
+    from sqlalchemy import text
+    from backend.database.db import Base, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO stocks (ticker, stock_price, stock_name) VALUES (:ticker, :price, :name)"),
+            [{"ticker": f"T{i}", "price": i + 0.5, "name": f"Stock {i}"} for i in range(stocks)]
+        )
+
+
+async def run(requests: int) -> dict:
+    import logging
+    import httpx
+    from sqlalchemy import event
+    from backend.common.responses import response_cache
+    from backend.database.db import engine
+    from backend.scripts.run import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    report = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        etag = (await client.get("/getstocks/")).headers["etag"]
+        for mode in ("rebuilt", "cached", "not_modified"):
+            headers = {"If-None-Match": etag} if mode == "not_modified" else {}
+            statements.clear()
+            started = time.perf_counter()
+            for _ in range(requests):
+                if mode == "rebuilt":
+                    # What every request cost before bodies were kept
+                    response_cache.invalidate("stocks")
+                response = await client.get("/getstocks/", headers=headers)
+            elapsed = time.perf_counter() - started
+            report[mode] = {
+                "status": response.status_code,
+                "bytes": len(response.content),
+                "us_per_request": round(elapsed / requests * 1e6, 1),
+                "queries_per_request": round(len(statements) / requests, 3),
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conditional GET benchmark for /getstocks/.")
+    parser.add_argument("--stocks", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["PRICE_REFRESH_ENABLED"] = "false"
+    import backend.models  # noqa: F401  Register all models before create_all
+    from backend.middleware.logs import logger
+    logger.disabled = True
+
+    seed(args.stocks)
+    report = asyncio.run(run(args.requests))
+    report.update({"stocks": args.stocks, "requests": args.requests})
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measures sync_crypto_to_stocks as the coin universe grows: latency, SQL
+statements issued and, on SQLite, WAL bytes written for an initial load, a
+re-sync where 10% of prices moved, a re-sync with no changes, and a refresh-sized
+batch (--batch coins, 10% moved) into the full table, which should cost the same
+whatever the table size.
+
+    python -m backend.benchmarks.crypto_sync --sizes 100 1000 5000 50000 --batch 250
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.benchmarks.stub_coingecko import StubCoinGecko
+
+
+def wal_size(path: str) -> int:
+    wal_path = path + "-wal"
+    return os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+
+
+def measure(session_factory, engine, db_path, coins: list) -> dict:
+    from backend.routes.stock_routes import sync_crypto_to_stocks
+
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    if db_path:
+        with engine.connect() as conn:
+            conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    db = session_factory()
+    try:
+        started = time.perf_counter()
+        summary = sync_crypto_to_stocks(coins, db)
+        elapsed = (time.perf_counter() - started) * 1000
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", listener)
+    return {
+        "ms": round(elapsed, 2),
+        "statements": len(statements),
+        "wal_bytes": wal_size(db_path) if db_path else None,
+        **summary,
+    }
+
+
+def run_size(size: int, batch: int, database_url: str | None) -> dict:
+    from backend.database.db import Base
+
+    db_path = None
+    if database_url is None:
+        db_path = os.path.join(tempfile.mkdtemp(), "sync.db")
+        database_url = "sqlite:///" + db_path
+    engine = create_engine(database_url)
+    if db_path:
+        with engine.connect() as conn:
+            conn.execute(text("PRAGMA journal_mode=WAL"))
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    stub = StubCoinGecko(coins=size)
+    report = {"coins": size, "initial": measure(session_factory, engine, db_path, stub.page(size, 1))}
+    stub.tick(0.1)
+    report["ten_percent_moved"] = measure(session_factory, engine, db_path, stub.page(size, 1))
+    report["no_changes"] = measure(session_factory, engine, db_path, stub.page(size, 1))
+    stub.tick(0.1)
+    report[f"batch_of_{batch}"] = measure(session_factory, engine, db_path, stub.page(batch, 1))
+    stub.stop()
+    engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bulk crypto sync as the coin universe grows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--batch", type=int, default=250, help="Coins per refresh-sized sync")
+    parser.add_argument("--database-url", default=None, help="Scratch database URL (default: temporary SQLite files)")
+    args = parser.parse_args()
+
+    import backend.models  # noqa: F401  Register all models before create_all
+    report = [run_size(size, args.batch, args.database_url) for size in args.sizes]
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Measures event-loop responsiveness while the async routes serve parallel load.
+
+A probe coroutine sleeps for a fixed interval and records how late it wakes up.
+In "async" mode the load is concurrent GET /transactions/{username} calls served
+through the AsyncSession path. In "blocking" mode the same query runs through the
+sync Session directly on the loop, which is how the handlers used to behave.
+
+    python -m backend.benchmarks.event_loop_latency --mode async --concurrency 50
+    python -m backend.benchmarks.event_loop_latency --mode blocking --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Event-loop latency under parallel load.")
+    parser.add_argument("--mode", choices=["async", "blocking"], default="async")
+    parser.add_argument("--database-url", default=None, help="Scratch database URL (default: temporary SQLite file)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--trades", type=int, default=500, help="Ledger rows seeded for the benchmark user")
+    parser.add_argument("--probe-interval-ms", type=float, default=5.0)
+    return parser.parse_args()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def seed(trades: int):
+    from sqlalchemy import text
+    from backend.database.db import Base, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, hashed_password, balance) VALUES (1, 'bench', 'x', 0)"))
+        conn.execute(text("INSERT INTO stocks (id, ticker, stock_price, stock_name) VALUES (1, 'BTC', 1, 'Bitcoin')"))
+        conn.execute(
+            text("INSERT INTO transactions (user_id, ticker_id, transaction_type, transaction_volume, "
+                 "transaction_price, created_time) VALUES (1, 1, 'BUY', 1, 1, CURRENT_TIMESTAMP)"),
+            [{} for _ in range(trades)]
+        )
+
+
+async def probe(stop: asyncio.Event, interval: float, lags: list[float]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def run_async_load(args, latencies: list[float]):
+    import httpx
+    from backend.common.security import create_access_token
+    from backend.scripts.run import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get("/transactions/bench", headers=headers)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+
+
+async def run_blocking_load(args, latencies: list[float]):
+    from backend.database.db import SessionLocal
+    from backend.models.transaction import Transaction
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            db = SessionLocal()
+            try:
+                db.query(Transaction).filter(Transaction.user_id == 1).all()
+            finally:
+                db.close()
+            latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+
+
+async def run(args) -> dict:
+    lags, latencies = [], []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(stop, args.probe_interval_ms / 1000, lags))
+
+    started = time.perf_counter()
+    if args.mode == "async":
+        await run_async_load(args, latencies)
+    else:
+        await run_blocking_load(args, latencies)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe_task
+    return {
+        "mode": args.mode,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "request_p50_ms": round(statistics.median(latencies), 3),
+        "request_p99_ms": round(percentile(latencies, 0.99), 3),
+        "loop_lag_p50_ms": round(statistics.median(lags), 3) if lags else None,
+        "loop_lag_p99_ms": round(percentile(lags, 0.99), 3) if lags else None,
+        "loop_lag_max_ms": round(max(lags), 3) if lags else None,
+        "probe_samples": len(lags),
+    }
+
+
+def main():
+    args = parse_args()
+    # The database URL has to be in place before backend modules create their engines
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    import backend.models  # noqa: F401  Register all models before create_all
+
+    seed(args.trades)
+    report = asyncio.run(run(args))
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Runs a full-market ingestion locally and checks it: a stub upstream with --coins coins, an
+in-memory Celery broker and result backend, and a thread-pool worker in this process.
+Reports pages, coins, stocks written, wall time and upstream requests (including the ones
+answered 429) as JSON, and exits non-zero unless the run completes with every coin's
+ticker in the stocks table.
+
+    python -m backend.benchmarks.ingestion --coins 20000 --concurrency 8 --upstream-rate-limit 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from backend.benchmarks.stub_coingecko import StubCoinGecko
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local paged Celery ingestion against a stub upstream.")
+    parser.add_argument("--coins", type=int, default=20000)
+    parser.add_argument("--per-page", type=int, default=250)
+    parser.add_argument("--concurrency", type=int, default=8, help="Worker threads")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="Seconds added to each stub response")
+    parser.add_argument("--upstream-rate-limit", type=int, default=50,
+                        help="Stub requests per second before it answers 429, 0 for no limit")
+    parser.add_argument("--task-rate-limit", default="40/s", help="INGEST_RATE_LIMIT for the worker")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    stub = StubCoinGecko(coins=args.coins, latency=args.upstream_latency, rate_limit=args.upstream_rate_limit).start()
+    os.environ.update({
+        "DATABASE_URL": "sqlite:///" + os.path.join(tempfile.mkdtemp(), "ingestion.db"),
+        "COINGECKO_BASE_URL": stub.base_url,
+        "CELERY_BROKER_URL": "memory://",
+        "CELERY_RESULT_BACKEND": "cache+memory://",
+        "INGEST_RATE_LIMIT": args.task_rate_limit,
+        "INGEST_RETRY_BACKOFF_SECONDS": "0.2",
+        "INGEST_MAX_PAGES": str(-(-args.coins // args.per_page)),
+        "PRICE_REFRESH_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    })
+    import backend.models  # noqa: F401  Register all models before create_all
+    from celery.contrib.testing.worker import start_worker
+    from backend.config.tasks import celery, ingest_markets
+    from backend.database.db import Base, SessionLocal, engine
+    from backend.models.ingestion import IngestionRun
+    from backend.models.stock import Stocks
+
+    Base.metadata.create_all(bind=engine)
+    expected = {coin["symbol"].upper()[:10] for coin in stub.coins}
+
+    try:
+        with start_worker(celery, pool="threads", concurrency=args.concurrency, perform_ping_check=False,
+                          loglevel="WARNING"):
+            started = time.perf_counter()
+            run_id = ingest_markets.delay(per_page=args.per_page).get(timeout=args.timeout)
+            db = SessionLocal()
+            try:
+                while True:
+                    run = db.get(IngestionRun, run_id)
+                    if run.status != "running":
+                        break
+                    if time.perf_counter() - started > args.timeout:
+                        raise SystemExit(f"Ingestion {run_id} did not finish within {args.timeout}s")
+                    time.sleep(0.1)
+                    db.expire_all()
+                elapsed = time.perf_counter() - started
+                tickers = {ticker for (ticker,) in db.query(Stocks.ticker)}
+            finally:
+                db.close()
+    finally:
+        stub.stop()
+
+    missing = len(expected - tickers)
+    report = {
+        "coins": args.coins,
+        "per_page": args.per_page,
+        "concurrency": args.concurrency,
+        "task_rate_limit": args.task_rate_limit,
+        "upstream_rate_limit": args.upstream_rate_limit,
+        "status": run.status,
+        "pages": run.pages,
+        "pages_failed": run.pages_failed,
+        "coins_ingested": run.coins,
+        "inserted": run.inserted,
+        "updated": run.updated,
+        "unchanged": run.unchanged,
+        "stocks_missing": missing,
+        "seconds": round(elapsed, 2),
+        "coins_per_second": round(run.coins / elapsed, 1),
+        "upstream_requests": stub.requests,
+        "upstream_rejected": stub.rejected,
+    }
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    sys.exit(0 if run.status == "completed" and not missing else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Connects many /ws/prices clients to a local server fed by the stub upstream and
+reports how many upstream requests and updates they caused. Upstream requests
+should track the refresh count, not the number of clients.
+
+    python -m backend.benchmarks.price_fanout --clients 500 --seconds 10 --interval 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from backend.benchmarks.stub_coingecko import StubCoinGecko
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int):
+    import uvicorn
+    from backend.database.db import Base, engine
+    from backend.scripts.run import app
+
+    Base.metadata.create_all(bind=engine)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_queue=32))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def listen(url: str, seconds: float, counts: list):
+    import websockets
+
+    received = 0
+    quotes = 0
+    async with websockets.connect(url, max_size=None) as websocket:
+        deadline = time.monotonic() + seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                message = json.loads(await asyncio.wait_for(websocket.recv(), remaining))
+            except asyncio.TimeoutError:
+                break
+            received += 1
+            quotes += len(message["quotes"])
+    counts.append((received, quotes))
+
+
+async def run(port: int, clients: int, seconds: float) -> dict:
+    counts = []
+    url = f"ws://127.0.0.1:{port}/ws/prices"
+    await asyncio.gather(*(listen(url, seconds, counts) for _ in range(clients)))
+    messages = sorted(received for received, _ in counts)
+    return {
+        "clients_finished": len(counts),
+        "messages_per_client_min": messages[0] if messages else 0,
+        "messages_per_client_max": messages[-1] if messages else 0,
+        "quotes_received_total": sum(quotes for _, quotes in counts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket price fan-out benchmark.")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=1.0, help="Price refresh interval in seconds")
+    parser.add_argument("--coins", type=int, default=250)
+    parser.add_argument("--changed", type=float, default=0.1, help="Fraction of coins moved between refreshes")
+    args = parser.parse_args()
+
+    stub = StubCoinGecko(coins=args.coins).start()
+    os.environ["COINGECKO_BASE_URL"] = stub.base_url
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["PRICE_REFRESH_INTERVAL_SECONDS"] = str(args.interval)
+    os.environ["PRICE_REFRESH_JITTER_SECONDS"] = "0"
+    os.environ["PRICE_REFRESH_COUNT"] = str(min(args.coins, 250))
+    import backend.models  # noqa: F401  Register all models before create_all
+
+    port = _free_port()
+    server, thread = start_server(port)
+
+    # Move some prices between refreshes so every refresh carries a partial update
+    stop_ticking = threading.Event()
+
+    def tick():
+        while not stop_ticking.wait(args.interval):
+            stub.tick(args.changed)
+
+    threading.Thread(target=tick, daemon=True).start()
+    try:
+        report = asyncio.run(run(port, args.clients, args.seconds))
+        import httpx
+        status = httpx.get(f"http://127.0.0.1:{port}/api/prices/status").json()
+    finally:
+        stop_ticking.set()
+        server.should_exit = True
+        thread.join()
+        stub.stop()
+
+    report.update({
+        "clients": args.clients,
+        "seconds": args.seconds,
+        "stub_requests": stub.requests,
+        "feed": status["feed"],
+        "last_summary": status["last_summary"],
+    })
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Checks the number of SQL statements each endpoint issues against a fixed budget, on a
+user with a long trade history, and exits non-zero if any endpoint goes over.
+Catches N+1 regressions such as building responses through lazy-loaded relationships.
+
+    python -m backend.benchmarks.query_budget --trades 5000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+STOCKS = 10
+
+# (method, path, body, budget, rows inserted), counted with the principal cache warm.
+# SQLite cannot batch INSERT ... RETURNING for the ORM, so it also gets one query per inserted row.
+ENDPOINTS = [
+    ("GET", "/users/bench", None, 1, 0),
+    ("GET", "/users/bench/portfolio", None, 1, 0),
+    ("GET", "/users/bench/pnl", None, 1, 0),
+    ("GET", "/transactions/bench", None, 1, 0),
+    ("GET", "/transactions/bench?limit=50", None, 1, 0),
+    ("GET", "/transactions/bench?stream=true", None, 1, 0),
+    ("GET", "/transactions/bench/range", None, 1, 0),
+    ("GET", "/transactions/bench/range?group_by=ticker", None, 1, 0),
+    ("GET", "/getstocks/", None, 1, 0),
+    ("GET", "/stocks/T0", None, 1, 0),
+    ("POST", "/transactions",
+     {"username": "bench", "ticker": "T0", "transaction_volume": 1, "transaction_type": "BUY"}, 7, 0),
+    ("POST", "/transactions",
+     {"username": "bench", "ticker": "T0", "transaction_volume": 1, "transaction_type": "SELL"}, 9, 0),
+    ("POST", "/transactions/batch",
+     {"orders": [{"username": "bench", "ticker": f"T{i}", "transaction_volume": 1, "transaction_type": "BUY"}
+                 for i in range(STOCKS)]}, 7, 2 * STOCKS),
+]
+
+
+def seed(trades: int):
+    from sqlalchemy import text
+    from backend.common.positions import rebuild_positions
+    from backend.database.db import Base, SessionLocal, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, hashed_password, balance) "
+                          "VALUES (1, 'bench', 'x', 1000000000)"))
+        conn.execute(
+            text("INSERT INTO stocks (id, ticker, stock_price, stock_name) VALUES (:id, :ticker, :price, :name)"),
+            [{"id": i + 1, "ticker": f"T{i}", "price": 10.0 + i, "name": f"Stock {i}"} for i in range(STOCKS)]
+        )
+        conn.execute(
+            text("INSERT INTO transactions (user_id, ticker_id, transaction_type, transaction_volume, "
+                 "transaction_price, created_time) VALUES (1, :stock_id, :type, 1, :price, CURRENT_TIMESTAMP)"),
+            [{"stock_id": i % STOCKS + 1, "type": "SELL" if i % 3 == 2 else "BUY", "price": 10.0 + i % STOCKS}
+             for i in range(trades)]
+        )
+    db = SessionLocal()
+    try:
+        rebuild_positions(db)
+    finally:
+        db.close()
+
+
+def run() -> tuple[list, bool]:
+    import logging
+    from fastapi.testclient import TestClient
+    from backend.common.responses import response_cache
+    from backend.common.security import create_access_token
+    from backend.database.db import async_engine
+    from backend.database.query_counter import QueryCounter
+    from backend.scripts.run import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    batches_returning = async_engine.dialect.name != "sqlite"
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+    results = []
+    within_budget = True
+    with TestClient(app) as client:
+        for method, path, body, budget, rows in ENDPOINTS:
+            if not batches_returning:
+                budget += rows
+            # Warm the principal cache, so only the endpoint's own queries are counted
+            client.get("/users/bench", headers=headers).raise_for_status()
+            # Quote bodies are otherwise served from memory without touching the database
+            response_cache.invalidate("stocks")
+            with QueryCounter(label=f"{method} {path}") as queries:
+                response = client.request(method, path, headers=headers, json=body)
+            response.raise_for_status()
+            try:
+                queries.check(budget)
+                ok = True
+            except AssertionError as e:
+                print(e, file=sys.stderr)
+                ok = within_budget = False
+            results.append({"endpoint": f"{method} {path}", "queries": queries.count, "budget": budget, "ok": ok})
+    return results, within_budget
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-endpoint SQL statement budget check.")
+    parser.add_argument("--trades", type=int, default=5000, help="Length of the seeded trade history")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["PRICE_REFRESH_ENABLED"] = "false"
+    import backend.models  # noqa: F401  Register all models before create_all
+    from backend.middleware.logs import logger
+    logger.disabled = True
+
+    seed(args.trades)
+    results, within_budget = run()
+    json.dump({"trades": args.trades, "endpoints": results}, sys.stdout, indent=2)
+    print()
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
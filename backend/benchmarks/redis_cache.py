@@ -0,0 +1,133 @@
+"""
+Checks RedisCache against an in-process fakeredis server: least recently used entries are
+evicted once max_entries is exceeded, entries expire after their TTL, and the hit, miss,
+eviction and expiration counters match what happened. The steps run through both the
+synchronous methods and the coroutines (aget/aset/adelete, on redis.asyncio), and on
+MemoryCache, so every path is held to the same behaviour. Exits non-zero on any mismatch.
+
+Needs the dev requirements (pip install -r backend/requirements-dev.txt).
+
+    python -m backend.benchmarks.redis_cache
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import fakeredis
+
+from backend.common.cache import BaseCache, MemoryCache, RedisCache
+
+# Recency is scored by wall time, keep consecutive writes apart
+STEP_SECONDS = 0.002
+
+
+class SyncCalls:
+    """Drives a cache through its synchronous methods, with the coroutine names the steps use."""
+
+    def __init__(self, cache: BaseCache):
+        self.cache = cache
+
+    async def aget(self, key: str):
+        return self.cache.get(key)
+
+    async def aset(self, key: str, value, ttl: float | None = None):
+        self.cache.set(key, value, ttl)
+
+    async def adelete(self, key: str):
+        self.cache.delete(key)
+
+
+async def check_lru(cache: BaseCache, calls) -> list[str]:
+    """With room for 3 entries, touching "a" makes "b" the one evicted by a fourth."""
+    failures = []
+    for key in ("a", "b", "c"):
+        await calls.aset(key, {"key": key})
+        await asyncio.sleep(STEP_SECONDS)
+    await calls.aget("a")
+    await asyncio.sleep(STEP_SECONDS)
+    await calls.aset("d", {"key": "d"})
+
+    if await calls.aget("b") is not None:
+        failures.append("least recently used entry was not evicted")
+    if [await calls.aget(key) for key in ("a", "c", "d")] != [{"key": key} for key in ("a", "c", "d")]:
+        failures.append("recently used entries were evicted")
+    if len(cache) != 3:
+        failures.append(f"{len(cache)} entries held, expected 3")
+    return failures
+
+
+async def check_ttl(calls, ttl: float) -> list[str]:
+    """An entry set with a short TTL is gone after it, others are not."""
+    failures = []
+    await calls.aset("short", 1, ttl=ttl)
+    await calls.aset("long", 2)
+    if await calls.aget("short") != 1:
+        failures.append("entry missing before its TTL")
+    await asyncio.sleep(ttl * 2)
+    if await calls.aget("short") is not None:
+        failures.append("entry still served after its TTL")
+    if await calls.aget("long") != 2:
+        failures.append("entry with the default TTL expired early")
+    return failures
+
+
+async def check_delete(cache: BaseCache, calls) -> list[str]:
+    failures = []
+    await calls.aset("gone", 1)
+    await calls.adelete("gone")
+    if await calls.aget("gone") is not None:
+        failures.append("deleted entry still served")
+    cache.clear()
+    if len(cache):
+        failures.append(f"{len(cache)} entries left after clear")
+    return failures
+
+
+# Counters after the steps above: hits for a, a, c, d, short, long; misses for b, short, gone;
+# d evicts b, then short and long evict a and c; the expired "short" is counted once
+EXPECTED_STATS = {"hits": 6, "misses": 3, "evictions": 3, "expirations": 1}
+
+
+async def run(name: str, cache: BaseCache, calls, ttl: float) -> dict:
+    failures = await check_lru(cache, calls) + await check_ttl(calls, ttl) + await check_delete(cache, calls)
+    stats = cache.stats.as_dict()
+    for counter, expected in EXPECTED_STATS.items():
+        if stats[counter] != expected:
+            failures.append(f"{counter} is {stats[counter]}, expected {expected}")
+    return {"cache": name, "stats": stats, "failures": failures}
+
+
+async def run_all(ttl: float) -> list[dict]:
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    async_client = fakeredis.FakeAsyncRedis(server=server)
+
+    redis_sync = RedisCache(client, async_client, "check_sync", max_entries=3, default_ttl=60)
+    redis_async = RedisCache(client, async_client, "check_async", max_entries=3, default_ttl=60)
+    memory = MemoryCache(max_entries=3, default_ttl=60)
+    results = [
+        await run("RedisCache", redis_sync, SyncCalls(redis_sync), ttl),
+        await run("RedisCache (async)", redis_async, redis_async, ttl),
+        await run("MemoryCache", memory, SyncCalls(memory), ttl),
+    ]
+    for result, namespace in zip(results, ("check_sync", "check_async")):
+        leftover = [key.decode() for key in client.scan_iter(match=f"{namespace}:*")]
+        if leftover:
+            result["failures"].append(f"keys left in Redis after clear: {leftover}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RedisCache eviction, expiry and counter check on fakeredis.")
+    parser.add_argument("--ttl", type=float, default=0.2, help="Seconds to live for the expiring entry")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_all(args.ttl))
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    sys.exit(1 if any(result["failures"] for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Checks the shared memory quote table's sequence lock: a reader running alongside a writer
+in another process never sees a torn table, and a table left mid-write by a crashed
+writer reads consistently again after the next write. Reports read throughput and
+price lookup time, and exits non-zero on any inconsistency.
+
+    python -m backend.benchmarks.shared_prices --coins 1000 --writes 2000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from backend.common.shared_prices import SEQUENCE, SEQUENCE_OFFSET, SharedPriceTable
+
+
+def quotes(coins: int, price: float) -> list[dict]:
+    return [{"id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}", "current_price": price,
+             "market_cap": float(coins - i)} for i in range(coins)]
+
+
+def writer(name: str, coins: int, writes: int):
+    table = SharedPriceTable.attach(name)
+    for write in range(writes):
+        table.write(quotes(coins, float(write)))
+
+
+def check_concurrent(table: SharedPriceTable, coins: int, writes: int) -> dict:
+    """Every snapshot read while another process writes must hold one price for every coin."""
+    process = multiprocessing.get_context("fork").Process(target=writer, args=(table.name, coins, writes))
+    process.start()
+    reads = torn = retried_out = 0
+    while process.is_alive():
+        snapshot = table.snapshot()
+        if snapshot is None:
+            retried_out += 1
+            continue
+        reads += 1
+        if len({quote["current_price"] for quote in snapshot[2]}) > 1:
+            torn += 1
+    process.join()
+    return {"reads": reads, "torn_reads": torn, "reads_given_up": retried_out}
+
+
+def check_crash_recovery(table: SharedPriceTable, coins: int) -> dict:
+    """A writer that died mid-write leaves the sequence odd, the next write must still end even."""
+    sequence = table.sequence()
+    SEQUENCE.pack_into(table._buf, SEQUENCE_OFFSET, sequence | 1)
+    stuck = table.price("C0")
+    table.write(quotes(coins, 42.0))
+    return {
+        "price_while_stuck": stuck,
+        "sequence_after_rewrite": table.sequence(),
+        "price_after_rewrite": table.price("C0"),
+        "snapshot_after_rewrite": table.snapshot(limit=1) is not None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared quote table consistency check.")
+    parser.add_argument("--coins", type=int, default=1000)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=100000)
+    args = parser.parse_args()
+
+    table = SharedPriceTable.create(f"prices_check_{os.getpid()}", args.coins)
+    try:
+        table.write(quotes(args.coins, 0.0))
+        concurrent = check_concurrent(table, args.coins, args.writes)
+        recovery = check_crash_recovery(table, args.coins)
+
+        started = time.perf_counter()
+        for _ in range(args.lookups):
+            table.price(f"C{args.coins // 2}")
+        lookup_us = (time.perf_counter() - started) / args.lookups * 1e6
+    finally:
+        table.close()
+
+    failures = []
+    if concurrent["torn_reads"]:
+        failures.append(f"{concurrent['torn_reads']} torn reads")
+    if recovery["sequence_after_rewrite"] & 1 or recovery["price_after_rewrite"] != 42.0:
+        failures.append("table did not recover from a writer that died mid-write")
+    json.dump({"coins": args.coins, "writes": args.writes, "concurrent": concurrent, "crash_recovery": recovery,
+               "price_lookup_us": round(lookup_us, 2), "failures": failures}, sys.stdout, indent=2)
+    print()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
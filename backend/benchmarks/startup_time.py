@@ -0,0 +1,141 @@
+"""
+Measures cold-start cost in fresh interpreters and checks it against a budget:
+importing backend.scripts.run, building the app with create_app(), and a uvicorn worker
+from spawn to its first 200 response. Import phases run under `python -X importtime`
+to list the slowest modules and to check that deferred modules (the HTTP client,
+database drivers, Celery, Redis) are not imported before they are needed.
+Exits non-zero if a budget is exceeded or a deferred module is imported early.
+
+    python -m backend.benchmarks.startup_time --repeat 5 --import-budget-ms 1500
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+STAGES = {
+    "import": "import backend.scripts.run",
+    "create_app": "import backend.scripts.run as run; run.create_app()",
+}
+
+# Imported lazily on first use, none of them should be loaded by importing or building the app
+DEFERRED_MODULES = ["httpx", "aiosqlite", "asyncpg", "psycopg2", "redis", "celery"]
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_stage(code: str, env: dict) -> dict:
+    """Run one stage in a fresh interpreter and parse its -X importtime output."""
+    probe = f"{code}\nimport sys\nprint(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], env=env,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent)))
+    # Top-level entries are the ones the stage imported directly
+    total_us = sum(cumulative for _, _, cumulative, depth in modules if depth == 0)
+    return {
+        "wall_ms": wall * 1000,
+        "imports_ms": total_us / 1000,
+        "modules": modules,
+        "deferred_imported": [name for name in result.stdout.strip().splitlines()[-1].split(",") if name]
+        if result.stdout.strip() else [],
+    }
+
+
+def measure_worker(env: dict) -> float:
+    """Milliseconds from spawning a uvicorn worker to its first 200 response."""
+    import urllib.request
+
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.scripts.run:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise SystemExit(f"Worker exited with code {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time and import budget check.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per stage, the median is reported")
+    parser.add_argument("--import-budget-ms", type=float, default=1500,
+                        help="Budget for the import stage's own imports")
+    parser.add_argument("--create-app-budget-ms", type=float, default=2500,
+                        help="Budget for import plus create_app()")
+    parser.add_argument("--worker-budget-ms", type=float, default=4000,
+                        help="Budget from spawning a worker to its first response")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list by self time")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": os.environ.get("DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "startup.db"),
+        "PRICE_REFRESH_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+
+    report = {"repeat": args.repeat, "stages": {}}
+    failures = []
+    budgets = {"import": args.import_budget_ms, "create_app": args.create_app_budget_ms}
+    for stage, code in STAGES.items():
+        runs = [measure_stage(code, env) for _ in range(args.repeat)]
+        imports_ms = statistics.median(run["imports_ms"] for run in runs)
+        slowest = sorted(runs[-1]["modules"], key=lambda module: module[1], reverse=True)[:args.top]
+        deferred = sorted({name for run in runs for name in run["deferred_imported"]})
+        report["stages"][stage] = {
+            "imports_ms": round(imports_ms, 1),
+            "wall_ms": round(statistics.median(run["wall_ms"] for run in runs), 1),
+            "budget_ms": budgets[stage],
+            "deferred_imported": deferred,
+            "slowest_self_ms": {name: round(self_us / 1000, 1) for name, self_us, _, _ in slowest},
+        }
+        if imports_ms > budgets[stage]:
+            failures.append(f"{stage}: imports took {imports_ms:.0f} ms, budget is {budgets[stage]:.0f} ms")
+        if deferred:
+            failures.append(f"{stage}: imported deferred modules {', '.join(deferred)}")
+
+    worker_ms = statistics.median(measure_worker(env) for _ in range(args.repeat))
+    report["stages"]["worker_first_response"] = {"wall_ms": round(worker_ms, 1), "budget_ms": args.worker_budget_ms}
+    if worker_ms > args.worker_budget_ms:
+        failures.append(f"worker: first response after {worker_ms:.0f} ms, budget is {args.worker_budget_ms:.0f} ms")
+
+    report["failures"] = failures
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Local stand-in for the CoinGecko markets API.
+
+Serves GET /api/v3/coins/markets and /api/v3/coins/list with a synthetic, deterministic
+coin universe so the client, sync and ingestion paths can be exercised without the real
+upstream. With a rate limit, requests over it get 429 with Retry-After, as upstream does.
+Point the app at it with COINGECKO_BASE_URL=http://127.0.0.1:<port>/api/v3
+
+    python -m backend.benchmarks.stub_coingecko --port 8900 --coins 5000 --rate-limit 50
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubCoinGecko:
+    """Threaded HTTP server returning synthetic market data."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, coins: int = 250, latency: float = 0.0,
+                 rate_limit: int = 0):
+        self.latency = latency
+        # Requests allowed per one-second window, 0 for no limit
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.rejected = 0
+        self._window = (0, 0)
+        self._lock = threading.Lock()
+        self._rng = random.Random(42)
+        self.coins = [
+            {
+                "id": f"coin-{i}",
+                "symbol": f"c{i}",
+                "name": f"Coin {i}",
+                "current_price": round(self._rng.uniform(0.01, 50000), 4),
+                "market_cap": (coins - i) * 1000000,
+                "market_cap_rank": i + 1,
+            }
+            for i in range(coins)
+        ]
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v3"
+
+    def tick(self, fraction: float = 0.1):
+        """Move the price of a random fraction of the coins."""
+        with self._lock:
+            for coin in self._rng.sample(self.coins, max(1, int(len(self.coins) * fraction))):
+                coin["current_price"] = round(coin["current_price"] * self._rng.uniform(0.95, 1.05), 4)
+
+    def _allow(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            if not self.rate_limit:
+                return True
+            second = int(time.monotonic())
+            window, count = self._window
+            count = count + 1 if window == second else 1
+            self._window = (second, count)
+            if count > self.rate_limit:
+                self.rejected += 1
+                return False
+            return True
+
+    def listing(self) -> list:
+        with self._lock:
+            return [{"id": coin["id"], "symbol": coin["symbol"], "name": coin["name"]} for coin in self.coins]
+
+    def page(self, per_page: int, page: int) -> list:
+        start = (page - 1) * per_page
+        with self._lock:
+            return [dict(coin) for coin in self.coins[start:start + per_page]]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path not in ("/api/v3/coins/markets", "/api/v3/coins/list"):
+                    self._send(404, {"error": "not found"})
+                    return
+                if not stub._allow():
+                    self._send(429, {"error": "rate limited"}, {"Retry-After": "1"})
+                    return
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if url.path == "/api/v3/coins/list":
+                    self._send(200, stub.listing())
+                    return
+                params = parse_qs(url.query)
+                per_page = min(int(params.get("per_page", ["100"])[0]), 250)
+                page = int(params.get("page", ["1"])[0])
+                self._send(200, stub.page(per_page, page))
+
+            def _send(self, status: int, payload, headers: dict | None = None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubCoinGecko":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local CoinGecko markets stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--coins", type=int, default=250)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of artificial delay per request")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per second before answering 429")
+    args = parser.parse_args()
+
+    stub = StubCoinGecko(args.host, args.port, args.coins, args.latency, args.rate_limit)
+    print(f"Serving stub CoinGecko at {stub.base_url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Fires concurrent BUY/SELL orders at a few users through the ASGI app and checks that
+every accepted order is reflected exactly once in the balance, position and ledger.
+
+Within one process the per-user lock runs a user's orders one at a time, so the
+users.version check never fails. --without-user-lock drops that lock and lets every
+in-flight order race the others on its own session, as orders on different workers do,
+so conflicts go through the version check and retries. Retries by cause and the orders
+that gave up with 409 are reported next to the consistency check.
+
+    python -m backend.benchmarks.trade_contention --orders 2000 --users 4 --concurrency 64
+    python -m backend.benchmarks.trade_contention --orders 2000 --users 4 --without-user-lock
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+START_BALANCE = 1_000_000.0
+PRICE = 10.0
+
+
+def seed(users: int):
+    from sqlalchemy import text
+    from backend.database.db import Base, engine
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (id, username, hashed_password, balance) VALUES (:id, :username, 'x', :balance)"),
+            [{"id": i, "username": f"trader{i}", "balance": START_BALANCE} for i in range(1, users + 1)]
+        )
+        conn.execute(text("INSERT INTO stocks (id, ticker, stock_price, stock_name) VALUES (1, 'BTC', :price, 'Bitcoin')"),
+                     {"price": PRICE})
+
+
+async def fire(orders: int, users: int, concurrency: int) -> tuple[Counter, float]:
+    import logging
+    import httpx
+    from backend.common.security import create_access_token
+    from backend.scripts.run import app
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    tokens = [create_access_token({"sub": f"trader{i}"}) for i in range(1, users + 1)]
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def order(client: httpx.AsyncClient, n: int):
+        body = {"username": f"trader{n % users + 1}", "ticker": "BTC", "transaction_volume": random.randint(1, 5),
+                "transaction_type": "BUY" if n % 3 else "SELL"}
+        headers = {"Authorization": f"Bearer {tokens[n % users]}"}
+        async with semaphore:
+            response = await client.post("/transactions", json=body, headers=headers)
+        statuses[response.status_code] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(order(client, n) for n in range(orders)))
+        elapsed = time.perf_counter() - started
+    return statuses, elapsed
+
+
+def retries() -> dict[str, int]:
+    from prometheus_client import REGISTRY
+
+    return {
+        cause: int(REGISTRY.get_sample_value("trade_retries_total", {"cause": cause}) or 0)
+        for cause in ("version", "position_insert", "locked")
+    }
+
+
+def check(users: int) -> list[str]:
+    """Recompute balances and positions from the ledger and compare them with the stored values."""
+    from sqlalchemy import text
+    from backend.database.db import engine
+
+    problems = []
+    with engine.connect() as conn:
+        for user_id, balance in conn.execute(text("SELECT id, balance FROM users ORDER BY id")):
+            bought, sold, net = conn.execute(text(
+                "SELECT COALESCE(SUM(CASE WHEN transaction_type = 'BUY' THEN transaction_price END), 0), "
+                "COALESCE(SUM(CASE WHEN transaction_type = 'SELL' THEN transaction_price END), 0), "
+                "COALESCE(SUM(CASE WHEN transaction_type = 'BUY' THEN transaction_volume "
+                "ELSE -transaction_volume END), 0) FROM transactions WHERE user_id = :user_id"
+            ), {"user_id": user_id}).one()
+            position = conn.execute(text(
+                "SELECT COALESCE(SUM(net_volume), 0) FROM positions WHERE user_id = :user_id"
+            ), {"user_id": user_id}).scalar_one()
+            expected = START_BALANCE - bought + sold
+            if abs(balance - expected) > 1e-6:
+                problems.append(f"user {user_id}: balance {balance} != ledger {expected}")
+            if abs(position - net) > 1e-6:
+                problems.append(f"user {user_id}: position {position} != ledger {net}")
+            if position < 0:
+                problems.append(f"user {user_id}: negative position {position}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent orders against a handful of users.")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--without-user-lock", action="store_true",
+                        help="Let a user's orders race each other as if they ran on separate workers")
+    parser.add_argument("--database-url", help="Scratch database, its tables are dropped and recreated. "
+                                                "Defaults to a fresh SQLite file")
+    args = parser.parse_args()
+
+    # Never the configured DATABASE_URL, seeding drops every table
+    os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["PRICE_REFRESH_ENABLED"] = "false"
+    import backend.models  # noqa: F401  Register all models before create_all
+
+    seed(args.users)
+    if args.without_user_lock:
+        from backend.common import trading
+
+        # A fresh lock per order serializes nothing
+        trading._user_lock = lambda user_id: asyncio.Lock()
+    statuses, elapsed = asyncio.run(fire(args.orders, args.users, args.concurrency))
+    problems = check(args.users)
+
+    json.dump({
+        "orders": args.orders,
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "user_lock": not args.without_user_lock,
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(args.orders / elapsed, 1),
+        "statuses": dict(statuses),
+        "retries": retries(),
+        "gave_up_409": statuses.get(409, 0),
+        "consistent": not problems,
+        "problems": problems,
+    }, sys.stdout, indent=2)
+    print()
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
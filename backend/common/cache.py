@@ -0,0 +1,279 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import orjson
+from prometheus_client import Counter, Gauge
+
+from backend.config.config import settings
+
+# Lookups are counters, so they add up across the workers started by backend.scripts.serve.
+# Entries are per worker for in-process caches, so the gauge keeps one series per process.
+CACHE_HITS = Counter("cache_hits", "Cache lookups that found an entry", ["cache"])
+CACHE_MISSES = Counter("cache_misses", "Cache lookups that found nothing", ["cache"])
+CACHE_ENTRIES = Gauge("cache_entries", "Entries currently held", ["cache"], multiprocess_mode="liveall")
+
+
+class CacheStats:
+    """Counters used to size a cache, also exported as metrics once bound to a name."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._hit_metric = self._miss_metric = self._entries_metric = None
+
+    def bind(self, namespace: str):
+        self._hit_metric = CACHE_HITS.labels(namespace)
+        self._miss_metric = CACHE_MISSES.labels(namespace)
+        self._entries_metric = CACHE_ENTRIES.labels(namespace)
+
+    def hit(self):
+        self.hits += 1
+        if self._hit_metric is not None:
+            self._hit_metric.inc()
+
+    def miss(self):
+        self.misses += 1
+        if self._miss_metric is not None:
+            self._miss_metric.inc()
+
+    def entries(self, count: int):
+        if self._entries_metric is not None:
+            self._entries_metric.set(count)
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class BaseCache(ABC):
+    """
+    Key/value cache with a per-entry TTL and a bound on the number of entries.
+    Backends evict the least recently used entry when the bound is reached.
+
+    Coroutines should use aget/aset/adelete. Here they call the synchronous methods,
+    which is right for in-process backends; network backends override them.
+    """
+
+    def __init__(self, max_entries: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def get(self, key: str):
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value, ttl: float | None = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    async def aget(self, key: str):
+        return self.get(key)
+
+    async def aset(self, key: str, value, ttl: float | None = None):
+        self.set(key, value, ttl)
+
+    async def adelete(self, key: str):
+        self.delete(key)
+
+    def info(self) -> dict:
+        return {"backend": type(self).__name__, "entries": len(self), "max_entries": self.max_entries,
+                **self.stats.as_dict()}
+
+
+class MemoryCache(BaseCache):
+    """In-process LRU cache, safe to share between threads."""
+
+    def __init__(self, max_entries: int = 128, default_ttl: float = 3600):
+        super().__init__(max_entries, default_ttl)
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.miss()
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.miss()
+                self.stats.entries(len(self._entries))
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hit()
+            return value
+
+    def set(self, key: str, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+            self.stats.entries(len(self._entries))
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+            self.stats.entries(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats.entries(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache(BaseCache):
+    """
+    Redis-backed cache shared between workers.
+    Values are stored as JSON with a Redis TTL. Recency is tracked in a sorted set
+    under the namespace so the oldest keys can be evicted once max_entries is exceeded.
+    Counters are per process.
+
+    client is a redis.Redis for synchronous callers, async_client a redis.asyncio.Redis
+    on the same server for aget/aset/adelete, so coroutines never block the event loop.
+    """
+
+    def __init__(self, client, async_client, namespace: str, max_entries: int = 128, default_ttl: float = 3600):
+        super().__init__(max_entries, default_ttl)
+        self.client = client
+        self.async_client = async_client
+        self.namespace = namespace
+        self._recency_key = f"{namespace}:__recency__"
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _ttl_ms(self, ttl: float | None) -> int:
+        return int((self.default_ttl if ttl is None else ttl) * 1000)
+
+    def _evicted_keys(self, evicted) -> list[str]:
+        return [self._key(member.decode() if isinstance(member, bytes) else member) for member, _ in evicted]
+
+    def get(self, key: str):
+        raw = self.client.get(self._key(key))
+        if raw is None:
+            self.stats.miss()
+            # Drop recency bookkeeping for keys Redis already expired
+            if self.client.zrem(self._recency_key, key):
+                self.stats.expirations += 1
+            return None
+        self.client.zadd(self._recency_key, {key: time.time()})
+        self.stats.hit()
+        return orjson.loads(raw)
+
+    def set(self, key: str, value, ttl: float | None = None):
+        pipe = self.client.pipeline()
+        pipe.set(self._key(key), orjson.dumps(value), px=self._ttl_ms(ttl))
+        pipe.zadd(self._recency_key, {key: time.time()})
+        pipe.zcard(self._recency_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            evicted = self.client.zpopmin(self._recency_key, size - self.max_entries)
+            if evicted:
+                self.client.delete(*self._evicted_keys(evicted))
+                self.stats.evictions += len(evicted)
+        self.stats.entries(min(size, self.max_entries))
+
+    def delete(self, key: str):
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(key))
+        pipe.zrem(self._recency_key, key)
+        pipe.zcard(self._recency_key)
+        self.stats.entries(pipe.execute()[-1])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.namespace}:*"))
+        if keys:
+            self.client.delete(*keys)
+        self.stats.entries(0)
+
+    def __len__(self) -> int:
+        return self.client.zcard(self._recency_key)
+
+    async def aget(self, key: str):
+        raw = await self.async_client.get(self._key(key))
+        if raw is None:
+            self.stats.miss()
+            if await self.async_client.zrem(self._recency_key, key):
+                self.stats.expirations += 1
+            return None
+        await self.async_client.zadd(self._recency_key, {key: time.time()})
+        self.stats.hit()
+        return orjson.loads(raw)
+
+    async def aset(self, key: str, value, ttl: float | None = None):
+        pipe = self.async_client.pipeline()
+        pipe.set(self._key(key), orjson.dumps(value), px=self._ttl_ms(ttl))
+        pipe.zadd(self._recency_key, {key: time.time()})
+        pipe.zcard(self._recency_key)
+        size = (await pipe.execute())[-1]
+        if size > self.max_entries:
+            evicted = await self.async_client.zpopmin(self._recency_key, size - self.max_entries)
+            if evicted:
+                await self.async_client.delete(*self._evicted_keys(evicted))
+                self.stats.evictions += len(evicted)
+        self.stats.entries(min(size, self.max_entries))
+
+    async def adelete(self, key: str):
+        pipe = self.async_client.pipeline()
+        pipe.delete(self._key(key))
+        pipe.zrem(self._recency_key, key)
+        pipe.zcard(self._recency_key)
+        self.stats.entries((await pipe.execute())[-1])
+
+
+# Every cache built by create_cache, by namespace, so their counters can be reported together
+CACHES: dict[str, BaseCache] = {}
+
+
+def register_cache(namespace: str, cache: BaseCache):
+    """Report the cache's counters under namespace, in /api/cache/stats and in the metrics."""
+    cache.stats.bind(namespace)
+    CACHES[namespace] = cache
+
+
+def create_cache(namespace: str, max_entries: int | None = None, default_ttl: float = 3600) -> BaseCache:
+    """Build a cache using the backend selected by settings.CACHE_BACKEND."""
+    max_entries = settings.CACHE_MAX_ENTRIES if max_entries is None else max_entries
+    if settings.CACHE_BACKEND == "redis":
+        import redis
+        import redis.asyncio
+
+        cache = RedisCache(redis.Redis.from_url(settings.REDIS_URL), redis.asyncio.Redis.from_url(settings.REDIS_URL),
+                           namespace, max_entries=max_entries, default_ttl=default_ttl)
+    elif settings.CACHE_BACKEND == "memory":
+        cache = MemoryCache(max_entries=max_entries, default_ttl=default_ttl)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+    register_cache(namespace, cache)
+    return cache
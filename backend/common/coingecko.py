@@ -0,0 +1,140 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+from backend.config.config import settings
+from backend.middleware.metrics import UPSTREAM_ERRORS, UPSTREAM_LATENCY
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class CoinGeckoClient:
+    """
+    Async client for the CoinGecko markets API.
+
+    Keeps one pooled keep-alive connection set per event loop and collapses
+    concurrent requests for the same (vs_currency, count) into a single
+    upstream call. Celery ingestion tasks use the blocking page methods instead,
+    on a separate pooled client.
+    """
+
+    def __init__(self, base_url: str, timeout: float, max_connections: int, max_keepalive_connections: int):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._client: "httpx.AsyncClient | None" = None
+        self._sync_client: "httpx.Client | None" = None
+        self._inflight: dict[tuple[str, int], asyncio.Task] = {}
+        self.upstream_requests = 0
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        # httpx is imported on the first upstream call, not when the app is imported
+        import httpx
+
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+            )
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits)
+        return self._client
+
+    def _get_sync_client(self) -> "httpx.Client":
+        import httpx
+
+        if self._sync_client is None or self._sync_client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+            )
+            self._sync_client = httpx.Client(base_url=self.base_url, timeout=self.timeout, limits=limits)
+        return self._sync_client
+
+    def _request_sync(self, endpoint: str, path: str, params: dict | None = None) -> list:
+        self.upstream_requests += 1
+        started = time.perf_counter()
+        try:
+            response = self._get_sync_client().get(path, params=params)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            UPSTREAM_ERRORS.labels(endpoint, type(e).__name__).inc()
+            raise
+        finally:
+            UPSTREAM_LATENCY.labels(endpoint).observe(time.perf_counter() - started)
+
+    def coins_list(self) -> list:
+        """Every listed coin (id, symbol, name), used to size a full-market ingestion. Blocking."""
+        return self._request_sync("list", "/coins/list")
+
+    def markets_page(self, vs_currency: str, per_page: int, page: int) -> list:
+        """One page of coins by market cap, pages start at 1. Blocking, raises httpx.HTTPError."""
+        return self._request_sync("markets", "/coins/markets", {
+            "vs_currency": vs_currency,
+            "order": "market_cap_desc",
+            "per_page": per_page,
+            "page": page,
+            "sparkline": "false",
+        })
+
+    async def _request_markets(self, vs_currency: str, count: int) -> list:
+        self.upstream_requests += 1
+        started = time.perf_counter()
+        try:
+            response = await self._get_client().get(
+                "/coins/markets",
+                params={
+                    "vs_currency": vs_currency,
+                    "order": "market_cap_desc",
+                    "per_page": count,
+                    "page": 1,
+                    "sparkline": "false",
+                },
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            UPSTREAM_ERRORS.labels("markets", type(e).__name__).inc()
+            raise
+        finally:
+            UPSTREAM_LATENCY.labels("markets").observe(time.perf_counter() - started)
+
+    async def fetch_markets(self, vs_currency: str = "usd", count: int = 100) -> list:
+        """
+        Fetch the top coins by market cap.
+        Callers asking for the same key while a request is in flight share its result.
+        Raises httpx.HTTPError on network or upstream failures.
+        """
+        key = (vs_currency, count)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._request_markets(vs_currency, count))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield so one caller being cancelled does not cancel the shared request
+        return await asyncio.shield(task)
+
+    def _forget(self, key: tuple[str, int], task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved in case every waiter was cancelled
+            task.exception()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+coingecko_client = CoinGeckoClient(
+    base_url=settings.COINGECKO_BASE_URL,
+    timeout=settings.COINGECKO_TIMEOUT_SECONDS,
+    max_connections=settings.COINGECKO_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.COINGECKO_MAX_KEEPALIVE_CONNECTIONS,
+)
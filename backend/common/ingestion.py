@@ -0,0 +1,123 @@
+import random
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, insert, select, update
+
+from backend.common.coingecko import coingecko_client
+from backend.config.config import settings
+from backend.database.db import SessionLocal
+from backend.middleware.logs import logger
+from backend.models.ingestion import IngestionQuote, IngestionRun
+
+
+def start_run(vs_currency: str, per_page: int, max_pages: int) -> tuple[int, int]:
+    """Size a full-market ingestion from the upstream coin list and record it. Returns (run id, pages)."""
+    listed = len(coingecko_client.coins_list())
+    pages = min(max_pages, -(-listed // per_page))
+
+    db = SessionLocal()
+    try:
+        run = IngestionRun(vs_currency=vs_currency, pages=pages)
+        db.add(run)
+        db.commit()
+        logger.info("Ingestion %s started: %s listed coins in %s pages", run.id, listed, pages)
+        return run.id, pages
+    finally:
+        db.close()
+
+
+def stage_page(run_id: int, vs_currency: str, per_page: int, page: int) -> int:
+    """
+    Fetch one page of the market and bulk-insert it into the staging table.
+    Pages are staged rather than written to stocks, so a lower ranked coin on a later page
+    cannot take a ticker from a higher ranked one. Returns the number of coins staged.
+    """
+    coins = coingecko_client.markets_page(vs_currency, per_page, page)
+    rows = [
+        {
+            "run_id": run_id,
+            "rank": (page - 1) * per_page + position,
+            # Truncated to match the stocks table, as sync_crypto_to_stocks does
+            "symbol": (coin.get("symbol") or "").upper()[:10],
+            "name": (coin.get("name") or "Unknown")[:40],
+            "price": coin.get("current_price"),
+        }
+        for position, coin in enumerate(coins)
+    ]
+    if rows:
+        db = SessionLocal()
+        try:
+            db.execute(insert(IngestionQuote), rows)
+            db.commit()
+        finally:
+            db.close()
+    return len(rows)
+
+
+def retry_delay(error: Exception, retries: int) -> float:
+    """Seconds to wait before retrying a page: the upstream's Retry-After if given, else exponential backoff."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    return random.uniform(0.5, 1.0) * settings.INGEST_RETRY_BACKOFF_SECONDS * 2 ** retries
+
+
+def finish_run(run_id: int, results: list[dict]) -> dict:
+    """Merge the staged coins into stocks in market cap order, clear them and complete the run record."""
+    from backend.routes.stock_routes import sync_crypto_to_stocks
+
+    failed = sum(1 for result in results if result.get("error"))
+    if not results or failed < len(results):
+        status = "partial" if failed else "completed"
+    else:
+        status = "failed"
+
+    db = SessionLocal()
+    try:
+        staged = db.execute(
+            select(IngestionQuote.symbol, IngestionQuote.name, IngestionQuote.price)
+            .where(IngestionQuote.run_id == run_id)
+            .order_by(IngestionQuote.rank)
+        )
+        coins = [{"symbol": symbol, "name": name, "current_price": price} for symbol, name, price in staged]
+        # First occurrence of a ticker wins, the staged coins are in market cap order
+        summary = sync_crypto_to_stocks(coins, db) if coins else {"inserted": 0, "updated": 0, "unchanged": 0}
+
+        db.execute(delete(IngestionQuote).where(IngestionQuote.run_id == run_id))
+        db.execute(
+            update(IngestionRun).where(IngestionRun.id == run_id).values(
+                status=status,
+                pages_failed=failed,
+                coins=len(coins),
+                finished_time=datetime.now(timezone.utc),
+                **summary,
+            )
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    logger.info("Ingestion %s %s: %s coins, %s of %s pages failed, %s", run_id, status, len(coins), failed,
+                len(results), summary)
+    return {"run_id": run_id, "status": status, "pages": len(results), "pages_failed": failed,
+            "coins": len(coins), **summary}
+
+
+def fail_run(run_id: int):
+    """Mark a run failed and delete its staged coins, when the chord could not complete it."""
+    db = SessionLocal()
+    try:
+        db.execute(delete(IngestionQuote).where(IngestionQuote.run_id == run_id))
+        db.execute(
+            update(IngestionRun).where(IngestionRun.id == run_id, IngestionRun.status == "running")
+            .values(status="failed", finished_time=datetime.now(timezone.utc))
+        )
+        db.commit()
+    finally:
+        db.close()
+    logger.error("Ingestion %s failed, staged coins deleted", run_id)
@@ -0,0 +1,32 @@
+import base64
+from datetime import datetime
+
+import orjson
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+STREAM_BATCH_SIZE = 500
+
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    encoded = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(orjson.dumps(encoded)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor produced by encode_cursor, expecting `size` integer key values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, orjson.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Keys are compared against integer id columns, anything else must not reach the query
+    if (not isinstance(values, list) or len(values) != size
+            or not all(isinstance(value, int) and not isinstance(value, bool) for value in values)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def ndjson_line(row: dict) -> bytes:
+    return orjson.dumps(row) + b"\n"
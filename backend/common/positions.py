@@ -0,0 +1,193 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from backend.models.lot import Lot
+from backend.models.position import Position
+from backend.models.transaction import Transaction
+
+
+async def get_position(db: AsyncSession, user_id: int, stock_id: int) -> Position | None:
+    """Return the user's position row for a stock, if any."""
+    result = await db.execute(
+        select(Position).where(Position.user_id == user_id, Position.stock_id == stock_id)
+    )
+    return result.scalars().first()
+
+
+async def get_holdings(db: AsyncSession, user_id: int, stock_id: int) -> float:
+    """Return the net number of units a user holds of a stock."""
+    position = await get_position(db, user_id, stock_id)
+    if position is None:
+        return 0
+    return max(0, position.net_volume)
+
+
+# Volumes below this are treated as zero when closing lots
+LOT_EPSILON = 1e-9
+
+
+async def get_open_lots(db: AsyncSession, user_id: int, stock_ids) -> dict[int, list[Lot]]:
+    """Return the user's open lots for several stocks in one query, oldest first, keyed by stock id."""
+    lots = {stock_id: [] for stock_id in stock_ids}
+    if not lots:
+        return lots
+    result = await db.execute(
+        select(Lot)
+        .where(Lot.user_id == user_id, Lot.stock_id.in_(list(lots)), Lot.remaining_volume > 0)
+        .order_by(Lot.id)
+    )
+    for lot in result.scalars():
+        lots[lot.stock_id].append(lot)
+    return lots
+
+
+def _new_position(user_id: int, stock_id: int) -> Position:
+    return Position(user_id=user_id, stock_id=stock_id, net_volume=0, cost_basis=0, realized_pnl=0, trade_count=0)
+
+
+def _apply(position: Position, lots: list[Lot], transaction_type: str, volume: float, notional: float) -> Lot | None:
+    """
+    Apply a single trade to a position and its open lots (oldest first).
+    A BUY opens a lot, which is returned so the caller can add it to the session.
+    A SELL closes units FIFO and records proceeds minus their cost as realized P&L.
+    """
+    position.trade_count += 1
+    if transaction_type == "BUY":
+        position.net_volume += volume
+        position.cost_basis += notional
+        lot = Lot(user_id=position.user_id, stock_id=position.stock_id,
+                  volume=volume, remaining_volume=volume, unit_cost=notional / volume)
+        lots.append(lot)
+        return lot
+
+    if transaction_type == "SELL":
+        to_close = min(volume, max(0, position.net_volume))
+        cost = 0.0
+
+        # Units held before lots were tracked are the oldest, close them first at their average cost
+        untracked = position.net_volume - sum(lot.remaining_volume for lot in lots)
+        if untracked > LOT_EPSILON and to_close > 0:
+            untracked_cost = position.cost_basis - sum(lot.remaining_volume * lot.unit_cost for lot in lots)
+            closed = min(untracked, to_close)
+            cost += max(0, untracked_cost) * closed / untracked
+            to_close -= closed
+
+        while to_close > LOT_EPSILON and lots:
+            lot = lots[0]
+            closed = min(lot.remaining_volume, to_close)
+            cost += closed * lot.unit_cost
+            lot.remaining_volume -= closed
+            to_close -= closed
+            if lot.remaining_volume <= LOT_EPSILON:
+                lot.remaining_volume = 0
+                lots.pop(0)
+
+        position.realized_pnl += notional - cost
+        position.cost_basis -= cost
+        position.net_volume -= volume
+        if position.net_volume <= 0:
+            position.net_volume = 0
+            position.cost_basis = 0
+            for lot in lots:
+                lot.remaining_volume = 0
+            lots.clear()
+    return None
+
+
+async def apply_trade(db: AsyncSession, user_id: int, stock_id: int, transaction_type: str,
+                      volume: float, notional: float) -> Position:
+    """
+    Update the user's position and lots for a trade.
+    Does not commit, so the caller can write the ledger row in the same transaction.
+    """
+    transaction_type = transaction_type.upper()
+    position = await get_position(db, user_id, stock_id)
+    if position is None:
+        position = _new_position(user_id, stock_id)
+        db.add(position)
+
+    # Only a SELL consumes existing lots
+    lots = (await get_open_lots(db, user_id, [stock_id]))[stock_id] if transaction_type == "SELL" else []
+    lot = _apply(position, lots, transaction_type, volume, notional)
+    if lot is not None:
+        db.add(lot)
+    return position
+
+
+async def get_positions(db: AsyncSession, user_id: int, stock_ids) -> dict[int, Position]:
+    """Return the user's position rows for several stocks in one query, keyed by stock id."""
+    result = await db.execute(
+        select(Position).where(Position.user_id == user_id, Position.stock_id.in_(list(stock_ids)))
+    )
+    return {position.stock_id: position for position in result.scalars()}
+
+
+async def apply_trades(db: AsyncSession, user_id: int, trades: list[tuple[int, str, float, float]],
+                       positions: dict[int, Position] | None = None) -> dict[int, Position]:
+    """
+    Update the user's positions and lots for (stock_id, transaction_type, volume, notional) trades, in order.
+    Pass positions already loaded with get_positions to skip the lookup.
+    Does not commit, so the caller can write the ledger rows in the same transaction.
+    """
+    if positions is None:
+        positions = await get_positions(db, user_id, {stock_id for stock_id, *_ in trades})
+    lots = await get_open_lots(
+        db, user_id, {stock_id for stock_id, transaction_type, *_ in trades if transaction_type.upper() == "SELL"}
+    )
+
+    for stock_id, transaction_type, volume, notional in trades:
+        position = positions.get(stock_id)
+        if position is None:
+            position = _new_position(user_id, stock_id)
+            db.add(position)
+            positions[stock_id] = position
+        lot = _apply(position, lots.setdefault(stock_id, []), transaction_type.upper(), volume, notional)
+        if lot is not None:
+            db.add(lot)
+    return positions
+
+
+def rebuild_positions(db: Session, user_id: int | None = None, batch_size: int = 1000) -> int:
+    """
+    Recompute positions and lots from the transactions ledger.
+    Replays trades in order so cost basis and realized P&L match the incremental path.
+    Returns the number of positions written.
+    """
+    delete_positions = db.query(Position)
+    delete_lots = db.query(Lot)
+    ledger_query = db.query(
+        Transaction.user_id,
+        Transaction.ticker_id,
+        Transaction.transaction_type,
+        Transaction.transaction_volume,
+        Transaction.transaction_price
+    )
+    if user_id is not None:
+        delete_positions = delete_positions.filter(Position.user_id == user_id)
+        delete_lots = delete_lots.filter(Lot.user_id == user_id)
+        ledger_query = ledger_query.filter(Transaction.user_id == user_id)
+
+    positions = {}
+    open_lots = {}
+    all_lots = []
+    ordered = ledger_query.order_by(Transaction.id).yield_per(batch_size)
+    for trade_user_id, stock_id, transaction_type, volume, notional in ordered:
+        key = (trade_user_id, stock_id)
+        if key not in positions:
+            positions[key] = _new_position(trade_user_id, stock_id)
+            open_lots[key] = []
+        lot = _apply(positions[key], open_lots[key], transaction_type.upper(), volume, notional)
+        if lot is not None:
+            all_lots.append(lot)
+
+    try:
+        delete_lots.delete(synchronize_session=False)
+        delete_positions.delete(synchronize_session=False)
+        db.add_all(positions.values())
+        db.add_all(all_lots)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return len(positions)
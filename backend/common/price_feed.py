@@ -0,0 +1,151 @@
+import asyncio
+
+import orjson
+
+from backend.common import shared_prices
+from backend.common.coingecko import coingecko_client
+from backend.config.config import settings
+from backend.middleware.logs import logger
+
+# Fields pushed to clients, the rest of the upstream payload (e.g. last_updated) changes on every poll
+QUOTE_FIELDS = ("id", "symbol", "name", "image", "current_price", "price_change_percentage_24h",
+                "market_cap", "total_volume")
+
+
+class Subscriber:
+    """A connected client's bounded queue of serialized messages."""
+
+    def __init__(self, max_pending: int):
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=max_pending)
+        self.dropped = False
+
+
+class PriceFeed:
+    """
+    Fans out quote changes from one upstream poll to every connected client.
+
+    Fed by the background price refresher, or by its own poll loop while the refresher
+    is disabled and at least one client is connected. In workers started by
+    backend.scripts.serve the loop reads the shared quote table instead of the upstream. Each update is diffed against the
+    previous one and serialized once. A client whose queue is full is dropped instead of
+    buffering without bound or holding up the others.
+    """
+
+    def __init__(self, max_pending: int, interval: float, count: int, vs_currency: str):
+        self.max_pending = max_pending
+        self.interval = interval
+        self.count = count
+        self.vs_currency = vs_currency
+        self.quotes: dict[str, dict] = {}
+        self.subscribers: set[Subscriber] = set()
+        self.published = 0
+        self.dropped = 0
+        self._snapshot_message = self._message("snapshot", [])
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _message(kind: str, quotes: list) -> str:
+        return orjson.dumps({"type": kind, "quotes": quotes}).decode()
+
+    def snapshot_message(self) -> str:
+        return self._snapshot_message
+
+    def publish(self, data: list) -> list:
+        """Diff a market snapshot against the last one and queue the changed quotes for every client."""
+        quotes = {}
+        for coin in data:
+            quote = {field: coin.get(field) for field in QUOTE_FIELDS}
+            quotes[quote["id"]] = quote
+        changed = [quote for quote_id, quote in quotes.items() if self.quotes.get(quote_id) != quote]
+        self.quotes = quotes
+        self._snapshot_message = self._message("snapshot", list(quotes.values()))
+        if not changed:
+            return changed
+
+        message = self._message("update", changed)
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+        return changed
+
+    def _drop(self, subscriber: Subscriber):
+        # Slow consumer, discard its backlog and wake its writer so it closes the connection
+        self.subscribers.discard(subscriber)
+        subscriber.dropped = True
+        self.dropped += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.max_pending)
+        self.subscribers.add(subscriber)
+        self._ensure_poller()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _ensure_poller(self):
+        from backend.common.price_refresher import price_refresher
+
+        # The refresher already publishes every refresh
+        if price_refresher.running or (self._task is not None and not self._task.done()):
+            return
+        if shared_prices.table is not None:
+            self._task = asyncio.create_task(self._poll_shared(shared_prices.table))
+        else:
+            self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self):
+        while True:
+            try:
+                self.publish(await coingecko_client.fetch_markets(self.vs_currency, self.count))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Price feed poll failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def _poll_shared(self, table: shared_prices.SharedPriceTable):
+        # Checking the sequence is a single read, the table is only copied after the updater wrote to it
+        sequence = None
+        while True:
+            if table.sequence() != sequence:
+                snapshot = table.snapshot(limit=self.count)
+                if snapshot is not None and snapshot[2]:
+                    sequence, _, quotes = snapshot
+                    self.publish(quotes)
+            await asyncio.sleep(settings.SHARED_PRICES_POLL_SECONDS)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "quotes": len(self.quotes),
+            "updates_published": self.published,
+            "slow_consumers_dropped": self.dropped,
+            "polling": self._task is not None and not self._task.done(),
+        }
+
+
+price_feed = PriceFeed(
+    max_pending=settings.PRICE_FEED_MAX_PENDING,
+    interval=settings.PRICE_REFRESH_INTERVAL_SECONDS,
+    count=settings.PRICE_REFRESH_COUNT,
+    vs_currency=settings.PRICE_REFRESH_VS_CURRENCY,
+)
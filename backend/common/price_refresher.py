@@ -0,0 +1,118 @@
+import asyncio
+import random
+from datetime import datetime, timezone
+
+from starlette.concurrency import run_in_threadpool
+
+from backend.common.coingecko import coingecko_client
+from backend.common.price_feed import price_feed
+from backend.common.responses import response_cache
+from backend.common import shared_prices
+from backend.config.config import settings
+from backend.database.db import SessionLocal
+from backend.middleware.logs import logger
+
+
+class PriceRefresher:
+    """
+    Periodically pulls market data from CoinGecko and syncs it into the stocks table,
+    so request handlers only read from memory or the database.
+    """
+
+    def __init__(self, interval: float, jitter: float, count: int, vs_currency: str):
+        self.interval = interval
+        self.jitter = jitter
+        self.count = count
+        self.vs_currency = vs_currency
+        self.latest: list = []
+        self.last_refresh: datetime | None = None
+        self.last_summary: dict | None = None
+        self.last_error: str | None = None
+        # Set in the updater process started by backend.scripts.serve, the workers read it
+        self.shared_table: shared_prices.SharedPriceTable | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def keeps_stocks_synced(self) -> bool:
+        """Whether this refresher, or the updater process behind a shared table, syncs the stocks table."""
+        return self.running or shared_prices.table is not None
+
+    def _sync(self, data: list) -> dict:
+        from backend.routes.stock_routes import sync_crypto_to_stocks
+
+        db = SessionLocal()
+        try:
+            return sync_crypto_to_stocks(data, db)
+        finally:
+            db.close()
+
+    async def refresh_once(self) -> dict:
+        """Fetch the current market snapshot and write it to the cache and stocks table."""
+        from backend.routes.stock_routes import CACHE
+
+        data = await coingecko_client.fetch_markets(self.vs_currency, self.count)
+        if self.shared_table is not None:
+            # Workers see the new prices before the stocks table catches up
+            self.shared_table.write(data)
+        summary = await run_in_threadpool(self._sync, data)
+
+        # Keep fetch_crypto_data callers asking for the same key on the fresh snapshot
+        await CACHE.aset(f"crypto_{self.count}_{self.vs_currency}", data)
+        price_feed.publish(data)
+        self.latest = data
+        self.last_refresh = datetime.now(timezone.utc)
+        self.last_summary = summary
+        self.last_error = None
+        # Rebuild serialized /api/crypto/top20 bodies from the new snapshot
+        response_cache.invalidate("crypto")
+        return summary
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("Price refresh failed: %s", e)
+            # Jitter keeps several workers or replicas from hitting the upstream in lockstep
+            await asyncio.sleep(self.interval + random.uniform(0, self.jitter))
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "last_refresh": self.last_refresh.isoformat() if self.last_refresh else None,
+            "interval_seconds": self.interval,
+            "jitter_seconds": self.jitter,
+            "vs_currency": self.vs_currency,
+            "coins": len(self.latest),
+            "last_summary": self.last_summary,
+            "last_error": self.last_error,
+            "shared_table": shared_prices.table.status() if shared_prices.table is not None else None,
+        }
+
+
+price_refresher = PriceRefresher(
+    interval=settings.PRICE_REFRESH_INTERVAL_SECONDS,
+    jitter=settings.PRICE_REFRESH_JITTER_SECONDS,
+    count=settings.PRICE_REFRESH_COUNT,
+    vs_currency=settings.PRICE_REFRESH_VS_CURRENCY,
+)
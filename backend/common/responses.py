@@ -0,0 +1,104 @@
+import hashlib
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+import orjson
+from fastapi import Request, Response
+
+from backend.common.cache import MemoryCache, register_cache
+from backend.config.config import settings
+
+
+class CachedBody:
+    """A serialized response with its validators."""
+
+    __slots__ = ("body", "etag", "last_modified", "headers")
+
+    def __init__(self, body: bytes, last_modified: float, headers: dict | None = None):
+        self.body = body
+        # Strong validator: derived from the exact bytes sent
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.last_modified = last_modified
+        self.headers = headers or {}
+
+
+class ResponseCache:
+    """
+    Serialized JSON bodies of read endpoints, rebuilt only when the data they were built from changes.
+
+    Each body is stored with the version of its resource (e.g. "stocks") at build time.
+    Writers call invalidate(resource) and the next request rebuilds. Bodies also expire
+    after max_age, so changes made by other workers are picked up. A rebuilt body with the
+    same bytes keeps its ETag and Last-Modified, so clients keep getting 304s.
+    """
+
+    def __init__(self, max_entries: int, max_age: float):
+        self._bodies = MemoryCache(max_entries=max_entries, default_ttl=max_age)
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._last: dict[str, CachedBody] = {}
+        register_cache("responses", self._bodies)
+
+    def invalidate(self, resource: str):
+        with self._lock:
+            self._versions[resource] = self._versions.get(resource, 0) + 1
+
+    def version(self, resource: str) -> int:
+        """Read before loading the data, and pass to set(), so a concurrent write is never masked."""
+        return self._versions.get(resource, 0)
+
+    def get(self, resource: str, key: str) -> CachedBody | None:
+        entry = self._bodies.get(f"{resource}:{key}")
+        if entry is None:
+            return None
+        version, cached = entry
+        return cached if version == self._versions.get(resource, 0) else None
+
+    def set(self, resource: str, key: str, version: int, content, headers: dict | None = None) -> CachedBody:
+        body = orjson.dumps(content)
+        cache_key = f"{resource}:{key}"
+        with self._lock:
+            previous = self._last.get(cache_key)
+            if previous is not None and previous.body == body and previous.headers == (headers or {}):
+                cached = previous
+            else:
+                cached = CachedBody(body, time.time(), headers)
+                self._last[cache_key] = cached
+                if len(self._last) > self._bodies.max_entries:
+                    self._last.pop(next(iter(self._last)))
+        self._bodies.set(cache_key, (version, cached))
+        return cached
+
+
+def _not_modified(request: Request, cached: CachedBody) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # If-None-Match uses weak comparison
+        return "*" in tags or cached.etag in tags or f"W/{cached.etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return int(cached.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_response(request: Request, cached: CachedBody) -> Response:
+    """Send a cached body, or an empty 304 if the client's validators still match."""
+    headers = {
+        **cached.headers,
+        "ETag": cached.etag,
+        "Last-Modified": formatdate(cached.last_modified, usegmt=True),
+        # Let browsers keep the body but revalidate on every use
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, cached):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(max_entries=settings.CACHE_MAX_ENTRIES, max_age=settings.RESPONSE_CACHE_MAX_AGE_SECONDS)
@@ -0,0 +1,213 @@
+import math
+import struct
+import time
+from multiprocessing import shared_memory
+
+# Header: magic, capacity, sequence, quote count, index count, last write time.
+# The sequence is 8-byte aligned so the writer updates it with a single store.
+HEADER = struct.Struct("<4sIQIId")
+SEQUENCE = struct.Struct("<Q")
+SEQUENCE_OFFSET = 8
+MAGIC = b"PRC1"
+
+# One quote per record, in market cap order: id, symbol, name, image, then the numeric fields
+RECORD = struct.Struct("<64s16s64s160sdddd")
+TEXT_FIELDS = ("id", "symbol", "name", "image")
+NUMBER_FIELDS = ("current_price", "price_change_percentage_24h", "market_cap", "total_volume")
+PRICE = struct.Struct("<d")
+PRICE_OFFSET = 64 + 16 + 64 + 160
+
+# Ticker index sorted by ticker for binary search: ticker (as in stocks.ticker), record position
+INDEX = struct.Struct("<16sI")
+TICKER_WIDTH = 16
+TICKER_LENGTH = 10
+
+
+def _ticker(symbol: str | None) -> str:
+    """Ticker for a coin symbol, truncated the same way as stocks.ticker."""
+    return (symbol or "").upper()[:TICKER_LENGTH]
+
+
+def _text(value, width: int) -> bytes:
+    return str(value or "").encode()[:width]
+
+
+def _number(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _decode(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode(errors="ignore")
+
+
+class SharedPriceTable:
+    """
+    The current quote table in a shared memory segment, written by one process and read by many.
+
+    Fixed-width records in market cap order, followed by a ticker-sorted index. The writer
+    guards each update with a sequence lock: the sequence is odd while a write is in
+    progress and even once it is complete. Readers never lock, they read straight from
+    the segment and retry if the sequence changed underneath them.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._buf = shm.buf
+        self.owner = owner
+        magic, self.capacity, *_ = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory segment {shm.name!r} does not hold a price table")
+        self._records_offset = HEADER.size
+        self._index_offset = self._records_offset + RECORD.size * self.capacity
+
+    @staticmethod
+    def size(capacity: int) -> int:
+        return HEADER.size + (RECORD.size + INDEX.size) * capacity
+
+    @classmethod
+    def create(cls, name: str, capacity: int) -> "SharedPriceTable":
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.size(capacity))
+        HEADER.pack_into(shm.buf, 0, MAGIC, capacity, 0, 0, 0, 0.0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedPriceTable":
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching registers the segment with the resource tracker,
+            # which would unlink it when this process exits. Unregistering afterwards is not
+            # enough, a forked worker shares the owner's tracker and would drop its entry.
+            from multiprocessing import resource_tracker
+
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def sequence(self) -> int:
+        return SEQUENCE.unpack_from(self._buf, SEQUENCE_OFFSET)[0]
+
+    def write(self, quotes: list[dict]):
+        """Replace the table with a market snapshot (CoinGecko markets format). Single writer only."""
+        quotes = quotes[:self.capacity]
+        # Always odd, even if a writer died mid-write and left the sequence odd
+        sequence = self.sequence() | 1
+        SEQUENCE.pack_into(self._buf, SEQUENCE_OFFSET, sequence)
+
+        index = {}
+        for position, quote in enumerate(quotes):
+            RECORD.pack_into(
+                self._buf, self._records_offset + position * RECORD.size,
+                _text(quote.get("id"), 64), _text(quote.get("symbol"), 16),
+                _text(quote.get("name"), 64), _text(quote.get("image"), 160),
+                *(_number(quote.get(field)) for field in NUMBER_FIELDS)
+            )
+            # First occurrence wins, as in sync_crypto_to_stocks
+            index.setdefault(_ticker(quote.get("symbol")), position)
+        index.pop("", None)
+        for slot, ticker in enumerate(sorted(index)):
+            INDEX.pack_into(self._buf, self._index_offset + slot * INDEX.size, ticker.encode(), index[ticker])
+
+        HEADER.pack_into(self._buf, 0, MAGIC, self.capacity, sequence, len(quotes), len(index), time.time())
+        SEQUENCE.pack_into(self._buf, SEQUENCE_OFFSET, sequence + 1)
+
+    def _read(self, read, retries: int = 1000):
+        """Run read() until it sees a consistent table, or return None if the writer never finishes."""
+        for _ in range(retries):
+            before = self.sequence()
+            if before & 1:
+                time.sleep(0)
+                continue
+            result = read()
+            if self.sequence() == before:
+                return result
+        return None
+
+    def _quote(self, position: int) -> dict:
+        values = RECORD.unpack_from(self._buf, self._records_offset + position * RECORD.size)
+        quote = {field: _decode(raw) for field, raw in zip(TEXT_FIELDS, values)}
+        for field, value in zip(NUMBER_FIELDS, values[len(TEXT_FIELDS):]):
+            quote[field] = None if math.isnan(value) else value
+        return quote
+
+    def snapshot(self, limit: int | None = None) -> tuple[int, float, list[dict]] | None:
+        """Return (sequence, updated_at, quotes in market cap order), or None if no consistent read was possible."""
+        def read():
+            _, _, sequence, count, _, updated_at = HEADER.unpack_from(self._buf, 0)
+            count = count if limit is None else min(count, limit)
+            return sequence, updated_at, [self._quote(position) for position in range(count)]
+
+        return self._read(read)
+
+    def price(self, ticker: str) -> float | None:
+        """Current price for a ticker, by binary search over the index without copying the table."""
+        key = _ticker(ticker).encode().ljust(TICKER_WIDTH, b"\0")
+
+        def read():
+            _, _, _, _, index_count, _ = HEADER.unpack_from(self._buf, 0)
+            low, high = 0, index_count
+            while low < high:
+                middle = (low + high) // 2
+                entry, position = INDEX.unpack_from(self._buf, self._index_offset + middle * INDEX.size)
+                if entry < key:
+                    low = middle + 1
+                elif entry > key:
+                    high = middle
+                else:
+                    offset = self._records_offset + position * RECORD.size + PRICE_OFFSET
+                    (value,) = PRICE.unpack_from(self._buf, offset)
+                    return None if math.isnan(value) else value
+            return None
+
+        return self._read(read)
+
+    def status(self) -> dict:
+        _, capacity, sequence, count, _, updated_at = HEADER.unpack_from(self._buf, 0)
+        return {
+            "name": self.name,
+            "capacity": capacity,
+            "quotes": count,
+            "sequence": sequence,
+            "updated_at": updated_at or None,
+        }
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+# Attached in worker processes started by backend.scripts.serve, None otherwise
+table: SharedPriceTable | None = None
+
+
+def attach(name: str) -> SharedPriceTable:
+    global table
+    if table is None:
+        table = SharedPriceTable.attach(name)
+    return table
+
+
+def current_price(ticker: str, fallback: float) -> float:
+    """Price from the shared table when attached and it has the ticker, so every worker trades at the same price."""
+    if table is not None:
+        price = table.price(ticker)
+        if price is not None:
+            return price
+    return fallback
+
+
+def detach():
+    global table
+    if table is not None:
+        table.close()
+        table = None
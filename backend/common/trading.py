@@ -0,0 +1,182 @@
+import asyncio
+import random
+import weakref
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from backend.common.positions import apply_trade, apply_trades, get_holdings, get_positions
+from backend.config.config import settings
+from backend.middleware.logs import logger
+from backend.middleware.metrics import TRADE_RETRIES
+from backend.models.stock import Stocks
+from backend.models.transaction import Transaction
+from backend.models.users import Users
+
+
+# Orders for the same user on this worker run one at a time, so the version check
+# only has to catch conflicts with other workers
+_user_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _user_lock(user_id: int) -> asyncio.Lock:
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _user_locks[user_id] = lock
+    return lock
+
+
+# How a concurrent first trade in the same stock surfaces, on Postgres and on SQLite
+_POSITION_INSERT_CONFLICTS = ("uq_positions_user_stock", "UNIQUE constraint failed: positions.user_id, positions.stock_id")
+
+
+def _retry_cause(error: Exception) -> str | None:
+    """
+    Lost optimistic version checks and concurrent position inserts are retried,
+    as are SQLite lock timeouts under concurrent writers. Returns the cause, or
+    None for any other error, e.g. a foreign key violation.
+    """
+    if isinstance(error, StaleDataError):
+        return "version"
+    if isinstance(error, IntegrityError) and any(marker in str(error) for marker in _POSITION_INSERT_CONFLICTS):
+        return "position_insert"
+    if isinstance(error, OperationalError) and "locked" in str(error):
+        return "locked"
+    return None
+
+
+async def _run_with_retry(db: AsyncSession, user_id: int, attempt_trade):
+    """
+    Run attempt_trade(user) on a fresh read of the user and commit, under the user's lock.
+
+    users.version is checked on commit, so a concurrent trade from another worker makes
+    the attempt fail instead of overwriting the balance. Failed attempts are rolled back
+    and retried with jittered backoff, up to settings.TRADE_MAX_RETRIES.
+    """
+    async with _user_lock(user_id):
+        for attempt in range(settings.TRADE_MAX_RETRIES + 1):
+            try:
+                user = await db.get(Users, user_id, populate_existing=True)
+                result = await attempt_trade(user)
+                await db.commit()
+                return result, user
+
+            except HTTPException:
+                await db.rollback()
+                raise
+            except Exception as e:
+                await db.rollback()
+                cause = _retry_cause(e)
+                if cause is None:
+                    raise
+                if attempt == settings.TRADE_MAX_RETRIES:
+                    logger.warning("Trade for user %s gave up after %s attempts: %s", user_id, attempt + 1, e)
+                    raise HTTPException(status_code=409, detail="Too many concurrent orders, please retry")
+                TRADE_RETRIES.labels(cause).inc()
+                await asyncio.sleep(random.uniform(0, settings.TRADE_RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+
+async def execute_trade(db: AsyncSession, user_id: int, stock: Stocks, transaction_type: str,
+                        volume: float, price: float | None = None) -> tuple[Transaction, Users]:
+    """
+    Apply a BUY or SELL to the user's balance, position and ledger in one commit,
+    at `price` if given and at the stock's stored price otherwise.
+    """
+    transaction_type = transaction_type.upper()
+    # Plain values, the stock instance is expired by a rollback
+    stock_id, ticker = stock.id, stock.ticker
+    stock_price = stock.stock_price if price is None else price
+    transaction_price = stock_price * volume
+
+    async def attempt_trade(user: Users) -> Transaction:
+        if transaction_type == 'BUY':
+            # Check if user has enough balance
+            if user.balance < transaction_price:
+                raise HTTPException(status_code=400, detail="Insufficient balance")
+            user.balance -= transaction_price
+
+        elif transaction_type == 'SELL':
+            # Calculate user's current holdings for this stock
+            user_holdings = await get_holdings(db, user_id, stock_id)
+
+            if user_holdings < volume:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Insufficient holdings. You only have {user_holdings} units of {ticker}"
+                )
+
+            user.balance += transaction_price
+
+        new_transaction = Transaction(
+            user_id=user_id,
+            ticker_id=stock_id,
+            transaction_price=transaction_price,
+            transaction_volume=volume,
+            transaction_type=transaction_type
+        )
+        db.add(new_transaction)
+        await apply_trade(db, user_id, stock_id, transaction_type, volume, transaction_price)
+        return new_transaction
+
+    return await _run_with_retry(db, user_id, attempt_trade)
+
+
+async def execute_batch(db: AsyncSession, user_id: int,
+                        orders: list[tuple[int, str, str, float, float]]) -> tuple[list[Transaction], Users]:
+    """
+    Apply (stock_id, ticker, transaction_type, volume, stock_price) orders, in order, in one commit.
+
+    The balance is checked against the net cash of the whole batch, so sells can fund buys
+    listed before them. Each SELL is checked against the holdings left after the earlier
+    orders. Positions for every stock are loaded in one query and ledger rows are inserted
+    together. If any order fails the checks, nothing is written.
+    """
+    trades = [
+        (stock_id, ticker, transaction_type.upper(), volume, stock_price * volume)
+        for stock_id, ticker, transaction_type, volume, stock_price in orders
+    ]
+
+    async def attempt_trade(user: Users) -> list[Transaction]:
+        positions = await get_positions(db, user_id, {stock_id for stock_id, *_ in trades})
+
+        net_cash = sum(notional if transaction_type == 'SELL' else -notional
+                       for _, _, transaction_type, _, notional in trades)
+        if user.balance + net_cash < 0:
+            raise HTTPException(status_code=400, detail="Insufficient balance for this batch")
+
+        holdings = {stock_id: max(0, position.net_volume) for stock_id, position in positions.items()}
+        for index, (stock_id, ticker, transaction_type, volume, _) in enumerate(trades):
+            held = holdings.get(stock_id, 0)
+            if transaction_type == 'SELL':
+                if held < volume:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Order {index}: Insufficient holdings. You only have {held} units of {ticker}"
+                    )
+                holdings[stock_id] = held - volume
+            else:
+                holdings[stock_id] = held + volume
+
+        user.balance += net_cash
+        transactions = [
+            Transaction(
+                user_id=user_id,
+                ticker_id=stock_id,
+                transaction_price=notional,
+                transaction_volume=volume,
+                transaction_type=transaction_type
+            )
+            for stock_id, _, transaction_type, volume, notional in trades
+        ]
+        db.add_all(transactions)
+        await apply_trades(
+            db, user_id,
+            [(stock_id, transaction_type, volume, notional) for stock_id, _, transaction_type, volume, notional in trades],
+            positions=positions
+        )
+        return transactions
+
+    return await _run_with_retry(db, user_id, attempt_trade)
@@ -1,19 +1,21 @@
 # tasks.py
-from celery import Celery
-from sqlalchemy.orm import sessionmaker
-from backend.database.db import engine
+from celery import Celery, chord
+from backend.config.config import settings
+from backend.database.db import SessionLocal
+from backend.middleware.logs import logger
 from backend.models.stock import Stocks
 
-celery = Celery('tasks', broker="redis://localhost:6379/0", backend="redis://localhost:6379/0")
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+celery = Celery('tasks', broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+                backend=settings.CELERY_RESULT_BACKEND or settings.REDIS_URL)
 
 celery.conf.update(
-    task_time_limit=3
+    # Page fetches are slow and rate limited, hand them out one at a time so idle workers pick them up
+    worker_prefetch_multiplier=1,
+    broker_connection_retry_on_startup=True,
 )
 
 
-@celery.task
+@celery.task(time_limit=3)
 def fetch_all_stocks():
     db = SessionLocal()
     try:
@@ -23,3 +25,54 @@ def fetch_all_stocks():
                 stocks]
     finally:
         db.close()
+
+
+@celery.task
+def ingest_markets(vs_currency: str = "usd", per_page: int | None = None, max_pages: int | None = None) -> int:
+    """
+    Ingest the whole market: one fetch_market_page task per page, run in parallel across
+    workers, chorded into finish_ingestion. Returns the id of the ingestion run record.
+    """
+    from backend.common.ingestion import start_run
+
+    per_page = per_page or settings.INGEST_PAGE_SIZE
+    run_id, pages = start_run(vs_currency, per_page, max_pages or settings.INGEST_MAX_PAGES)
+    chord(
+        fetch_market_page.s(run_id, vs_currency, per_page, page) for page in range(1, pages + 1)
+    )(finish_ingestion.s(run_id).on_error(fail_ingestion.si(run_id)))
+    return run_id
+
+
+@celery.task(bind=True, rate_limit=settings.INGEST_RATE_LIMIT, max_retries=settings.INGEST_MAX_RETRIES,
+             time_limit=settings.INGEST_PAGE_TIME_LIMIT_SECONDS)
+def fetch_market_page(self, run_id: int, vs_currency: str, per_page: int, page: int) -> dict:
+    import httpx
+    from backend.common.ingestion import retry_delay, stage_page
+
+    try:
+        return {"page": page, "coins": stage_page(run_id, vs_currency, per_page, page)}
+    except httpx.HTTPError as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=retry_delay(e, self.request.retries))
+        # Report the failure instead of raising, so the chord still completes the run as partial
+        logger.error("Ingestion %s: page %s failed after %s retries: %s", run_id, page, self.max_retries, e)
+        return {"page": page, "coins": 0, "error": str(e)}
+    except Exception as e:
+        # Malformed bodies and database errors are not retried, but reported the same way
+        logger.exception("Ingestion %s: page %s failed", run_id, page)
+        return {"page": page, "coins": 0, "error": f"{type(e).__name__}: {e}"}
+
+
+@celery.task
+def finish_ingestion(results: list[dict], run_id: int) -> dict:
+    from backend.common.ingestion import finish_run
+
+    return finish_run(run_id, results)
+
+
+@celery.task
+def fail_ingestion(run_id: int):
+    """Error callback of the chord, e.g. a page task killed by its time limit: close the run and drop its staged coins."""
+    from backend.common.ingestion import fail_run
+
+    fail_run(run_id)
@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from backend.config.config import settings
-from sqlalchemy.orm import sessionmaker
+from backend.middleware.logs import logger
+from sqlalchemy.orm import Session, sessionmaker
 
 SQLALCHEMY_DATABASE_URL = settings.SQLALCHEMY_DATABASE_URL
 
@@ -9,23 +13,138 @@ SQLALCHEMY_DATABASE_URL = settings.SQLALCHEMY_DATABASE_URL
 # Check if we're using SQLite
 is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
 
-engine_args = {}
-if is_sqlite:
-    engine_args["connect_args"] = {"check_same_thread": False}
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, **engine_args
-)
-print(f"Connecting to database at: {SQLALCHEMY_DATABASE_URL}")
+def sqlite_pragmas() -> dict[str, object]:
+    """Pragmas from settings to run on each new SQLite connection, skipping empty values."""
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        # Negative values are KiB rather than pages
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB if settings.SQLITE_CACHE_SIZE_KB else None,
+    }
+    return {name: value for name, value in pragmas.items() if value not in ("", None)}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def engine_options() -> dict:
+    """create_engine keyword arguments for the configured backend, shared by the sync and async engines."""
+    if is_sqlite:
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+_engine_lock = threading.Lock()
+_engine = None
+_async_engine = None
+
+
+def get_engine():
+    """The sync engine, created on first use so importing this module never touches the database."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine_args = engine_options()
+                if is_sqlite:
+                    engine_args["connect_args"] = {"check_same_thread": False}
+                created = create_engine(SQLALCHEMY_DATABASE_URL, **engine_args)
+                if is_sqlite:
+                    event.listen(created, "connect", _set_sqlite_pragmas)
+                logger.info("Connecting to database at: %s", created.url.render_as_string(hide_password=True))
+                _engine = created
+    return _engine
+
+
+def get_async_engine():
+    """The asyncio engine, created on first use."""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                created = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), **engine_options())
+                if is_sqlite:
+                    event.listen(created.sync_engine, "connect", _set_sqlite_pragmas)
+                _async_engine = created
+    return _async_engine
+
+
+async def dispose_engines():
+    """Close pooled connections, e.g. on shutdown. The engines reconnect if used again."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
 
+def __getattr__(name: str):
+    # `from backend.database.db import engine` keeps working, and creates the engine at that point
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class _LazySession(Session):
+    """Binds to the sync engine when the session first needs a connection."""
+
+    def get_bind(self, mapper=None, **kw):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(mapper, **kw)
+
+
+class _LazyAsyncSession(Session):
+    """Sync side of an AsyncSession, bound to the asyncio engine when first needed."""
+
+    def get_bind(self, mapper=None, **kw):
+        if self.bind is None:
+            self.bind = get_async_engine().sync_engine
+        return super().get_bind(mapper, **kw)
+
+
+SessionLocal = sessionmaker(class_=_LazySession, autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
 
+def to_async_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart."""
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect == "postgresql":
+        return f"postgresql+asyncpg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+
+# Objects stay usable after commit so handlers can build responses without another round trip
+AsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=_LazyAsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
 def create_db():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
 
 def get_db():
@@ -34,3 +153,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
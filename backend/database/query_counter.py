@@ -0,0 +1,54 @@
+from sqlalchemy import event
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block of code issues more SQL statements than its budget allows."""
+
+
+class QueryCounter:
+    """
+    Records the SQL statements run on the given engines while active.
+
+    Defaults to both the sync and async engines, so it covers sync and async routes alike.
+    Use as a context manager, optionally with a budget that is checked on exit:
+
+        with QueryCounter(budget=1) as queries:
+            client.get("/transactions/alice", headers=headers)
+        queries.count  # 1
+    """
+
+    def __init__(self, *engines, budget: int | None = None, label: str = "block"):
+        if not engines:
+            from backend.database.db import async_engine, engine
+
+            engines = (engine, async_engine.sync_engine)
+        self.engines = engines
+        self.budget = budget
+        self.label = label
+        self.statements: list[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self) -> "QueryCounter":
+        self.statements = []
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._record)
+        if exc_type is None and self.budget is not None:
+            self.check(self.budget)
+
+    def check(self, budget: int):
+        """Raise QueryBudgetExceeded, listing the statements, if more than budget were run."""
+        if self.count > budget:
+            listing = "\n".join(f"  {index}: {' '.join(statement.split())}"
+                                for index, statement in enumerate(self.statements, 1))
+            raise QueryBudgetExceeded(f"{self.label} ran {self.count} queries, budget is {budget}:\n{listing}")
@@ -3,7 +3,8 @@ CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     username VARCHAR(70) UNIQUE NOT NULL,
     hashed_password VARCHAR NOT NULL,
-    balance FLOAT
+    balance FLOAT,
+    version INTEGER NOT NULL DEFAULT 1
 );
 
 -- Create the 'stocks' table
@@ -25,3 +26,58 @@ CREATE TABLE IF NOT EXISTS transactions (
     created_time TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create the 'positions' table (current holdings, maintained alongside transactions)
+CREATE TABLE IF NOT EXISTS positions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    stock_id INTEGER NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+    net_volume FLOAT NOT NULL DEFAULT 0,
+    cost_basis FLOAT NOT NULL DEFAULT 0,
+    realized_pnl FLOAT NOT NULL DEFAULT 0,
+    trade_count INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_positions_user_stock UNIQUE (user_id, stock_id)
+);
+
+-- Create the 'lots' table (units bought per BUY, consumed FIFO by SELLs)
+CREATE TABLE IF NOT EXISTS lots (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    stock_id INTEGER NOT NULL REFERENCES stocks(id) ON DELETE CASCADE,
+    volume FLOAT NOT NULL,
+    remaining_volume FLOAT NOT NULL,
+    unit_cost FLOAT NOT NULL
+);
+
+-- Create the 'ingestion_runs' table (one row per full-market ingestion)
+CREATE TABLE IF NOT EXISTS ingestion_runs (
+    id SERIAL PRIMARY KEY,
+    vs_currency VARCHAR(10) NOT NULL,
+    status VARCHAR(10) NOT NULL,
+    pages INTEGER NOT NULL,
+    pages_failed INTEGER NOT NULL,
+    coins INTEGER NOT NULL,
+    inserted INTEGER NOT NULL,
+    updated INTEGER NOT NULL,
+    unchanged INTEGER NOT NULL,
+    started_time TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    finished_time TIMESTAMP WITH TIME ZONE
+);
+
+-- Create the 'ingestion_quotes' table (coins staged by page tasks until the run completes)
+CREATE TABLE IF NOT EXISTS ingestion_quotes (
+    id SERIAL PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES ingestion_runs(id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    symbol VARCHAR(10),
+    name VARCHAR(40),
+    price FLOAT
+);
+
+-- Indexes for the per-user transaction queries
+CREATE INDEX IF NOT EXISTS ix_transactions_user_id_ticker_id ON transactions (user_id, ticker_id);
+CREATE INDEX IF NOT EXISTS ix_transactions_user_id_created_time ON transactions (user_id, created_time);
+CREATE INDEX IF NOT EXISTS ix_transactions_ticker_id ON transactions (ticker_id);
+CREATE INDEX IF NOT EXISTS ix_transactions_user_id_id ON transactions (user_id, id);
+CREATE INDEX IF NOT EXISTS ix_positions_stock_id ON positions (stock_id);
+CREATE INDEX IF NOT EXISTS ix_lots_open ON lots (user_id, stock_id, id) WHERE remaining_volume > 0;
+CREATE INDEX IF NOT EXISTS ix_ingestion_quotes_run_id_rank ON ingestion_quotes (run_id, rank);
@@ -1,13 +1,126 @@
+import atexit
 import logging
+import os
+import queue
+import random
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import orjson
+
+from backend.config.config import settings
 
 logger = logging.getLogger()
 
-formatter = logging.Formatter(fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-stream_handler = logging.StreamHandler(sys.stdout)
-file_handler = logging.FileHandler('app.log')
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of INFO and lower records from high-volume route handlers.
+    Rates are keyed by the logging function's name, warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.rates.get(record.funcName)
+        return rate is None or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without formatting them.
+    Records stay in process, so message % args is left for the listener, and
+    records are dropped rather than blocking the caller when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+formatter = JsonFormatter()
+
+
+def _file_handler(path: str) -> RotatingFileHandler:
+    handler = RotatingFileHandler(path, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT,
+                                  delay=True)
+    handler.setFormatter(formatter)
+    return handler
+
+
+# stderr, so scripts can print machine-readable output on stdout
+stream_handler = logging.StreamHandler(sys.stderr)
+stream_handler.setFormatter(formatter)
+file_handler = _file_handler(settings.LOG_FILE)
+
+# Only the queue handler runs on the request path, the listener thread does the formatting and I/O
+queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+listener = QueueListener(queue_handler.queue, stream_handler, file_handler, respect_handler_level=True)
+
+logger.handlers = [queue_handler]
+
+logger.setLevel(settings.LOG_LEVEL)
+
+listener.start()
+
+
+def _start_listener(*handlers):
+    global listener
+    queue_handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+
+def _restart_listener():
+    # The listener thread does not survive fork. A forked child only logs to the stream:
+    # several processes rotating the parent's file lose records, and a file per child
+    # would pile up for short-lived children such as recycled pool processes.
+    _start_listener(stream_handler)
+
+
+def use_process_log_file():
+    """Also write this process's records to LOG_FILE.<pid>, for the long-lived workers forked by backend.scripts.serve."""
+    global file_handler
+    listener.stop()
+    file_handler.close()
+    file_handler = _file_handler(f"{settings.LOG_FILE}.{os.getpid()}")
+    _start_listener(stream_handler, file_handler)
+
+
+def _stop_listener():
+    listener.stop()
 
-logger.handlers = [stream_handler, file_handler]
 
-logger.setLevel(logging.INFO)
\ No newline at end of file
+os.register_at_fork(after_in_child=_restart_listener)
+# Flush what is still queued on interpreter exit
+atexit.register(_stop_listener)
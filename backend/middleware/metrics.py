@@ -0,0 +1,134 @@
+import os
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from fastapi import Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy import event
+
+from backend.common.cache import CACHE_HITS, CACHE_MISSES
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to send the full response, by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being handled", ["method"], multiprocess_mode="livesum",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements issued while handling one request", ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+UPSTREAM_LATENCY = Histogram(
+    "coingecko_request_duration_seconds", "Latency of CoinGecko API calls", ["endpoint"],
+)
+UPSTREAM_ERRORS = Counter(
+    "coingecko_request_errors_total", "CoinGecko API calls that failed", ["endpoint", "error"],
+)
+TRADE_RETRIES = Counter(
+    "trade_retries_total", "Trade attempts rolled back and retried after a conflict, by cause", ["cause"],
+)
+SYNC_ROWS = Counter(
+    "stock_sync_rows_total", "Rows seen by the crypto to stocks sync, by outcome", ["outcome"],
+)
+
+# Statements issued by the current request, shared with threadpool workers through the copied context
+_query_count: ContextVar[list[int] | None] = ContextVar("query_count", default=None)
+
+
+def _count_query(*args):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def instrument_engine(engine):
+    """Count statements run on a sync engine (for an AsyncEngine pass its .sync_engine)."""
+    # The app's lifespan can run more than once per process, e.g. under tests
+    if not event.contains(engine, "before_cursor_execute", _count_query):
+        event.listen(engine, "before_cursor_execute", _count_query)
+
+
+class CacheCollector:
+    """
+    Reports each cache's hit ratio at scrape time, from the lookup counters collected by
+    source (every worker's, in multiprocess mode), or from this process's counters.
+    """
+
+    def __init__(self, source=None):
+        self.source = source
+
+    def collect(self):
+        families = self.source.collect() if self.source is not None else [*CACHE_HITS.collect(),
+                                                                            *CACHE_MISSES.collect()]
+        lookups = defaultdict(lambda: {"cache_hits": 0.0, "cache_misses": 0.0})
+        for family in families:
+            if family.name not in ("cache_hits", "cache_misses"):
+                continue
+            for sample in family.samples:
+                if sample.name.endswith("_total"):
+                    lookups[sample.labels["cache"]][family.name] += sample.value
+
+        ratio = GaugeMetricFamily("cache_hit_ratio", "Hits over lookups since start", labels=["cache"])
+        for namespace, counts in sorted(lookups.items()):
+            total = counts["cache_hits"] + counts["cache_misses"]
+            ratio.add_metric([namespace], counts["cache_hits"] / total if total else 0)
+        yield ratio
+
+
+REGISTRY.register(CacheCollector())
+
+
+class PrometheusMiddleware:
+    """
+    Records latency, in-flight requests and SQL statements per HTTP request.
+
+    Routes are labelled by their template (e.g. /users/{username}) so label cardinality
+    stays bounded, unmatched paths are grouped under one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        counter = [0]
+        token = _query_count.set(counter)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        # The route template is only known once the router has matched, so in-flight is per method
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _query_count.reset(token)
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(method, route, str(status)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(method, route).observe(counter[0])
+
+
+def metrics_endpoint(request: Request) -> Response:
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Set by backend.scripts.serve, every process it starts writes its samples there
+        registry = CollectorRegistry()
+        registry.register(CacheCollector(MultiProcessCollector(registry)))
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -1,4 +1,7 @@
 from .stock import Stocks
 from .users import Users
 from .transaction import Transaction
+from .position import Position
 
+from .lot import Lot
+from .ingestion import IngestionRun, IngestionQuote
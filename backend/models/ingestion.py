@@ -0,0 +1,50 @@
+from sqlalchemy import Column, ForeignKey, String, Float, DateTime, Integer, Index
+from sqlalchemy.sql import func
+from backend.database.db import Base
+
+
+class IngestionRun(Base):
+    """
+    A model representing one full-market price ingestion, written when it starts and
+    completed by the Celery chord callback once every page has been fetched.
+    """
+
+    __tablename__ = 'ingestion_runs'
+
+    id = Column(Integer, primary_key=True)
+    vs_currency = Column(String(10), nullable=False)
+    # running, completed, partial (some pages failed) or failed
+    status = Column(String(10), nullable=False, default='running')
+    pages = Column(Integer, nullable=False, default=0)
+    pages_failed = Column(Integer, nullable=False, default=0)
+    coins = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    unchanged = Column(Integer, nullable=False, default=0)
+    started_time = Column(DateTime(timezone=True), server_default=func.now())
+    finished_time = Column(DateTime(timezone=True))
+
+    class Config:
+        from_attributes = True
+
+
+class IngestionQuote(Base):
+    """
+    A model representing one coin staged by a page task, merged into stocks in market cap
+    order when the run completes and then deleted.
+    """
+
+    __tablename__ = 'ingestion_quotes'
+    __table_args__ = (
+        Index('ix_ingestion_quotes_run_id_rank', 'run_id', 'rank'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey('ingestion_runs.id'), nullable=False)
+    rank = Column(Integer, nullable=False)
+    symbol = Column(String(10))
+    name = Column(String(40))
+    price = Column(Float)
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, ForeignKey, Float, Integer, Index, text
+from sqlalchemy.orm import relationship
+from backend.database.db import Base
+
+
+class Lot(Base):
+    """
+    A model representing the units bought by one BUY, consumed FIFO by later SELLs.
+
+    Closed lots keep remaining_volume = 0 and drop out of the partial index,
+    so open-lot lookups stay proportional to the lots still held.
+    """
+
+    __tablename__ = 'lots'
+    __table_args__ = (
+        Index('ix_lots_open', 'user_id', 'stock_id', 'id',
+              postgresql_where=text('remaining_volume > 0'), sqlite_where=text('remaining_volume > 0')),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    stock_id = Column(Integer, ForeignKey('stocks.id'), nullable=False)
+    volume = Column(Float, nullable=False)
+    remaining_volume = Column(Float, nullable=False)
+    unit_cost = Column(Float, nullable=False)
+
+    user = relationship("Users", lazy="raise")
+    stock = relationship("Stocks", lazy="raise")
+
+    class Config:
+        from_attributes = True
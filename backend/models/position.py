@@ -0,0 +1,34 @@
+from sqlalchemy import Column, ForeignKey, Float, Integer, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+from backend.database.db import Base
+
+
+class Position(Base):
+    """
+    A model representing a user's current holding of a stock.
+
+    Maintained incrementally alongside the transactions ledger so that
+    holdings lookups do not need to scan the user's trade history.
+    """
+
+    __tablename__ = 'positions'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'stock_id', name='uq_positions_user_stock'),
+        Index('ix_positions_stock_id', 'stock_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    stock_id = Column(Integer, ForeignKey('stocks.id'), nullable=False)
+    net_volume = Column(Float, nullable=False, default=0)
+    cost_basis = Column(Float, nullable=False, default=0)
+    # Cumulative P&L of units sold, recorded FIFO against the open lots
+    realized_pnl = Column(Float, nullable=False, default=0, server_default='0')
+    # Trades ever applied to this position, so counting a user's trades does not scan the ledger
+    trade_count = Column(Integer, nullable=False, default=0, server_default='0')
+
+    user = relationship("Users", lazy="raise")
+    stock = relationship("Stocks", lazy="raise")
+
+    class Config:
+        from_attributes = True
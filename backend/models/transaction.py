@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, String, Float, DateTime, Integer
+from sqlalchemy import Column, ForeignKey, String, Float, DateTime, Integer, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.database.db import Base
@@ -10,6 +10,14 @@ class Transaction(Base):
     """
 
     __tablename__ = 'transactions'
+    __table_args__ = (
+        Index('ix_transactions_user_id_ticker_id', 'user_id', 'ticker_id'),
+        Index('ix_transactions_user_id_created_time', 'user_id', 'created_time'),
+        Index('ix_transactions_ticker_id', 'ticker_id'),
+        Index('ix_transactions_user_id_id', 'user_id', 'id'),
+    )
+    # Fetch id and created_time with the INSERT, so bulk inserts need no refresh per row
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -19,8 +27,10 @@ class Transaction(Base):
     transaction_price = Column(Float, nullable=False)
     created_time = Column(DateTime(timezone=True), server_default=func.now())
 
-    user = relationship("Users")
-    ticker = relationship("Stocks")
+    # Not loaded per row: list endpoints select the columns they need with the ticker joined in,
+    # and an accidental lazy load raises instead of issuing one query per transaction
+    user = relationship("Users", lazy="raise")
+    ticker = relationship("Stocks", lazy="raise")
 
     class Config:
         from_attributes = True
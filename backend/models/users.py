@@ -13,6 +13,10 @@ class Users(Base):
     username = Column(String(70), unique=True)
     hashed_password = Column(String, nullable=False)
     balance = Column(Float)
+    # Bumped on every update so concurrent trades on the same user are detected at commit
+    version = Column(Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {"version_id_col": version}
 
     class Config:
         from_attributes = True
@@ -1,12 +1,23 @@
 from fastapi import APIRouter
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from backend.middleware.logs import logger
+from backend.middleware.metrics import SYNC_ROWS
 from backend.models.stock import Stocks
 from backend.schemas.stock_schema import StockCreate, StockResponse
-from backend.database.db import get_db
-from fastapi import HTTPException, Depends
-import requests
-import time
+from backend.database.db import SessionLocal, get_db
+from fastapi import HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from backend.common.pagination import NEXT_CURSOR_HEADER, STREAM_BATCH_SIZE, decode_cursor, encode_cursor, ndjson_line
+from fastapi.concurrency import run_in_threadpool
+from backend.common.cache import CACHES, create_cache
+from backend.common.coingecko import coingecko_client
+from backend.common.price_feed import price_feed
+from backend.common.price_refresher import price_refresher
+from backend.common import shared_prices
+from backend.common.responses import cached_response, response_cache
+import asyncio
+from datetime import datetime, timezone
 
 router = APIRouter()
 
@@ -31,24 +42,67 @@ def create_stock(stock: StockCreate,
         stock_name=name_truncated,
         stock_price=stock.stock_price
     )
-    logger.info(f"{name_truncated}: is created with ticker: {ticker_truncated}")
+    logger.info("%s: is created with ticker: %s", name_truncated, ticker_truncated)
     db.add(db_stock)
     db.commit()
     db.refresh(db_stock)
+    response_cache.invalidate("stocks")
     return db_stock
 
 
+def _stream_stocks():
+    """Yield every stock as NDJSON, fetching rows in batches on a dedicated session."""
+    db = SessionLocal()
+    try:
+        query = select(Stocks.id, Stocks.ticker, Stocks.stock_name, Stocks.stock_price).order_by(Stocks.id)
+        for row in db.execute(query).yield_per(STREAM_BATCH_SIZE):
+            yield ndjson_line(row._asdict())
+    finally:
+        db.close()
+
+
 @router.get("/getstocks/", response_model=list[StockResponse])
-def get_all_stocks(db: Session = Depends(get_db)):
-    stocks = db.query(Stocks).all()
-    logger.info(f"fetching all stocks")
+def get_all_stocks(
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = None,
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Returns stocks ordered by id.
+    With `limit`, returns one page and puts the cursor for the next page in the
+    X-Next-Cursor header. With `stream=true`, streams every stock as NDJSON.
+    Pages are served from pre-serialized bodies with an ETag, so a matching
+    If-None-Match is answered with 304 without querying the database.
+    """
+    logger.info("fetching all stocks")
+    if stream:
+        return StreamingResponse(_stream_stocks(), media_type="application/x-ndjson")
+
+    last_id = decode_cursor(cursor, 1)[0] if cursor is not None else None
+    cache_key = f"{limit}:{last_id}"
+    cached = response_cache.get("stocks", cache_key)
+    if cached is None:
+        version = response_cache.version("stocks")
+        query = select(Stocks.id, Stocks.ticker, Stocks.stock_name, Stocks.stock_price).order_by(Stocks.id)
+        if last_id is not None:
+            query = query.where(Stocks.id > last_id)
+        if limit is not None:
+            query = query.limit(limit)
+        stocks = [row._asdict() for row in db.execute(query)]
+
+        headers = None
+        if limit is not None and len(stocks) == limit:
+            headers = {NEXT_CURSOR_HEADER: encode_cursor(stocks[-1]["id"])}
+        cached = response_cache.set("stocks", cache_key, version, stocks, headers)
 
-    return stocks
+    return cached_response(request, cached)
 
 
 @router.get("/stocks/{ticker}", response_model=StockResponse)
 def get_stock(ticker: str, db: Session = Depends(get_db)):
-    logger.info(f"Fetching stock data for  {ticker}")
+    logger.info("Fetching stock data for  %s", ticker)
     stock = db.query(Stocks).filter(Stocks.ticker == ticker).first()
     if stock is None:
         raise HTTPException(status_code=404, detail="Stock not found")
@@ -110,122 +164,247 @@ def get_stock(ticker: str, db: Session = Depends(get_db)):
 #         logger.error(f"Error during API call: {e}")
 #         raise HTTPException(status_code=500, detail="Failed to fetch cryptocurrency data")
 
-BASE_URL = "https://api.coingecko.com/api/v3/coins/markets"
-CACHE = {}
 CACHE_EXPIRY = 3600
+CACHE = create_cache("crypto", default_ttl=CACHE_EXPIRY)
 
 
-def fetch_crypto_data(vs_currency: str = "usd", count: int = 100):
+async def fetch_crypto_data(vs_currency: str = "usd", count: int = 100):
     """Fetch top cryptocurrencies from CoinGecko API"""
     # Check cache
-    current_time = time.time()
     cache_key = f"crypto_{count}_{vs_currency}"
-    if cache_key in CACHE and current_time - CACHE[cache_key]["timestamp"] < CACHE_EXPIRY:
-        return CACHE[cache_key]["data"]
+    cached = await CACHE.aget(cache_key)
+    if cached is not None:
+        return cached
 
-    # Fetch data from CoinGecko API
+    import httpx
+
+    # Fetch data from CoinGecko API, concurrent misses share one upstream request
     try:
-        response = requests.get(
-            BASE_URL,
-            params={
-                "vs_currency": vs_currency,
-                "order": "market_cap_desc",
-                "per_page": count,
-                "page": 1,
-                "sparkline": False,
-            },
-            timeout=15,
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = await coingecko_client.fetch_markets(vs_currency, count)
 
         # Cache the response
-        CACHE[cache_key] = {
-            "data": data,
-            "timestamp": current_time,
-        }
+        await CACHE.aset(cache_key, data)
+        response_cache.invalidate("crypto")
         return data
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch data: {str(e)}")
 
 
 @router.get("/api/crypto/top20")
-def get_top_20_crypto(vs_currency: str = "usd", sync: bool = False, db: Session = Depends(get_db)):
+async def get_top_20_crypto(request: Request, vs_currency: str = "usd", sync: bool = False,
+                            db: Session = Depends(get_db)):
     """
     Endpoint to fetch the top cryptocurrencies by market cap.
-    Also syncs them to the database so they can be traded.
+    Served from the background price refresher's snapshot when it is running, or from the
+    shared quote table when the worker was started by backend.scripts.serve. In both cases
+    the stocks table is already kept in sync and `sync` is a no-op.
+    The body is serialized once per refresh and carries an ETag for conditional requests.
     """
-    # Fetch top 100 for syncing (so all displayed coins can be traded)
-    data = fetch_crypto_data(vs_currency, count=100)
-    if not data:
-        raise HTTPException(status_code=404, detail="No cryptocurrency data available")
-    
-    # Always sync all cryptocurrencies to stocks table
-    # This ensures all displayed coins can be traded
-    if sync:
-        sync_crypto_to_stocks(data, db)
-    
-    # Return only top 20 for backward compatibility, but all 100 are synced
-    return {"top_20_cryptocurrencies": data[:20]}
+    refreshed = bool(price_refresher.latest) and vs_currency == price_refresher.vs_currency
+    shared = None
+    if not refreshed and shared_prices.table is not None and vs_currency == price_refresher.vs_currency:
+        shared = shared_prices.table.snapshot(limit=20)
+        if shared is not None and not shared[2]:
+            # The updater has not written its first snapshot yet
+            shared = None
+    if not refreshed and shared is None:
+        # Fetch top 100 for syncing (so all displayed coins can be traded)
+        data = await fetch_crypto_data(vs_currency, count=100)
+        if not data:
+            raise HTTPException(status_code=404, detail="No cryptocurrency data available")
+
+        # Sync all cryptocurrencies to stocks table when the background refresher is not doing it
+        # This ensures all displayed coins can be traded
+        if sync and not price_refresher.keeps_stocks_synced:
+            await run_in_threadpool(sync_crypto_to_stocks, data, db)
+
+    # A new table sequence means a new snapshot, no invalidation reaches this worker from the updater
+    cache_key = f"top20:{vs_currency}" if shared is None else f"top20:{vs_currency}:{shared[0]}"
+    cached = response_cache.get("crypto", cache_key)
+    if cached is None:
+        version = response_cache.version("crypto")
+        if refreshed:
+            content = {
+                "top_20_cryptocurrencies": price_refresher.latest[:20],
+                "last_refresh": price_refresher.last_refresh.isoformat(),
+            }
+        elif shared is not None:
+            _, updated_at, quotes = shared
+            content = {
+                "top_20_cryptocurrencies": quotes,
+                "last_refresh": datetime.fromtimestamp(updated_at, timezone.utc).isoformat(),
+            }
+        else:
+            # Return only top 20 for backward compatibility, but all 100 are synced
+            content = {"top_20_cryptocurrencies": data[:20], "last_refresh": None}
+        cached = response_cache.set("crypto", cache_key, version, content)
+
+    return cached_response(request, cached)
+
+
+@router.get("/api/prices/status")
+def get_price_refresh_status():
+    """
+    Reports when the stocks table was last refreshed from the upstream.
+    """
+    return {**price_refresher.status(), "feed": price_feed.status()}
+
+
+@router.get("/api/cache/stats")
+def get_cache_stats():
+    """
+    Reports size and hit/miss/eviction counters of every cache, by namespace.
+    """
+    return {namespace: cache.info() for namespace, cache in CACHES.items()}
+
+
+async def _send_quotes(websocket: WebSocket, subscriber):
+    try:
+        await websocket.send_text(price_feed.snapshot_message())
+        while True:
+            message = await subscriber.queue.get()
+            if message is None:
+                # 1013: try again later
+                await websocket.close(code=1013, reason="Client too slow")
+                return
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Clients send nothing, receive() returns once the connection closes
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/ws/prices")
+async def stream_prices(websocket: WebSocket):
+    """
+    Pushes a snapshot of the current quotes, then only the quotes that changed on each refresh.
+    Every client shares the same upstream poll. A client that falls too far behind is closed.
+    """
+    await websocket.accept()
+    subscriber = price_feed.subscribe()
+    sender = asyncio.create_task(_send_quotes(websocket, subscriber))
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        price_feed.unsubscribe(subscriber)
+
+
+def _upsert_stocks_statement(dialect_name: str):
+    """Build an INSERT ... ON CONFLICT (ticker) DO UPDATE for the given dialect."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+
+    statement = insert(Stocks.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=[Stocks.ticker],
+        set_={
+            "stock_name": statement.excluded.stock_name,
+            "stock_price": statement.excluded.stock_price,
+        },
+    )
+
+
+# Tickers per IN (...) lookup, well under SQLite's bound parameter limit
+SYNC_LOOKUP_CHUNK = 500
 
 
-def sync_crypto_to_stocks(crypto_data: list, db: Session):
+def sync_crypto_to_stocks(crypto_data: list, db: Session) -> dict:
     """
     Syncs cryptocurrency data to the stocks table.
-    Creates new stocks or updates existing ones.
+    Loads only the incoming tickers' rows, in chunks, and writes only new or changed rows
+    with a single bulk upsert, so the cost follows the batch rather than the table.
+    Returns an inserted/updated/unchanged summary.
     """
-    synced_count = 0
-    seen_tickers = set()  # Prevent duplicates within the same batch
-    
+    incoming = {}  # Prevent duplicates within the same batch, first occurrence wins
+
     for crypto in crypto_data:
         # Truncate ticker to 10 chars and name to 40 chars to match DB schema
-        ticker = crypto.get("symbol", "").upper()[:10]
-        name = crypto.get("name", "Unknown")[:40]
+        ticker = (crypto.get("symbol") or "").upper()[:10]
+        name = (crypto.get("name") or "Unknown")[:40]
         price = crypto.get("current_price", 0)
-        
-        if not ticker or ticker in seen_tickers:
+
+        if not ticker or ticker in incoming or price is None:
             continue
-            
-        seen_tickers.add(ticker)
-            
-        # Check if stock exists in database
-        existing_stock = db.query(Stocks).filter(Stocks.ticker == ticker).first()
-        
-        if existing_stock:
-            # Update price and name (in case it changed)
-            existing_stock.stock_price = price
-            existing_stock.stock_name = name
+
+        incoming[ticker] = {"ticker": ticker, "stock_name": name, "stock_price": price}
+
+    existing = {}
+    tickers = list(incoming)
+    for start in range(0, len(tickers), SYNC_LOOKUP_CHUNK):
+        chunk = tickers[start:start + SYNC_LOOKUP_CHUNK]
+        query = db.query(Stocks.ticker, Stocks.stock_name, Stocks.stock_price).filter(Stocks.ticker.in_(chunk))
+        existing.update((ticker, (stock_name, stock_price)) for ticker, stock_name, stock_price in query)
+
+    summary = {"inserted": 0, "updated": 0, "unchanged": 0}
+    changed_rows = []
+    for ticker, row in incoming.items():
+        current = existing.get(ticker)
+        if current is None:
+            summary["inserted"] += 1
+        elif current != (row["stock_name"], row["stock_price"]):
+            summary["updated"] += 1
         else:
-            # Create new stock
-            new_stock = Stocks(
-                ticker=ticker,
-                stock_name=name,
-                stock_price=price
-            )
-            db.add(new_stock)
-            synced_count += 1
-    
+            summary["unchanged"] += 1
+            continue
+        changed_rows.append(row)
+
+    SYNC_ROWS.labels("unchanged").inc(summary["unchanged"])
+    if not changed_rows:
+        logger.info("Synced %s unique cryptocurrencies (no changes)", len(incoming))
+        return summary
+
     try:
+        statement = _upsert_stocks_statement(db.get_bind().dialect.name)
+        if statement is not None:
+            db.execute(statement, changed_rows)
+        else:
+            # Other dialects have no upsert, write row by row
+            for row in changed_rows:
+                if row["ticker"] in existing:
+                    db.query(Stocks).filter(Stocks.ticker == row["ticker"]).update(
+                        {"stock_name": row["stock_name"], "stock_price": row["stock_price"]}
+                    )
+                else:
+                    db.add(Stocks(**row))
         db.commit()
-        logger.info(f"Synced {len(seen_tickers)} unique cryptocurrencies ({synced_count} new)")
+        response_cache.invalidate("stocks")
+        SYNC_ROWS.labels("inserted").inc(summary["inserted"])
+        SYNC_ROWS.labels("updated").inc(summary["updated"])
+        logger.info(
+            "Synced %s unique cryptocurrencies (%s new, %s updated, %s unchanged)",
+            len(incoming), summary["inserted"], summary["updated"], summary["unchanged"]
+        )
     except Exception as e:
         db.rollback()
-        logger.error(f"Failed to commit sync: {str(e)}")
+        logger.error("Failed to commit sync: %s", e)
         raise e
 
+    return summary
+
 
 @router.post("/api/stocks/sync-crypto")
-def sync_crypto_stocks(db: Session = Depends(get_db)):
+async def sync_crypto_stocks(db: Session = Depends(get_db)):
     """
     Manually sync all top 100 cryptocurrencies to the stocks table.
     This allows them to be used for transactions.
     """
-    data = fetch_crypto_data("usd", count=100)
+    data = await fetch_crypto_data("usd", count=100)
     if not data:
         raise HTTPException(status_code=404, detail="No cryptocurrency data available")
     
-    sync_crypto_to_stocks(data, db)
+    summary = await run_in_threadpool(sync_crypto_to_stocks, data, db)
     
-    return {"message": f"Successfully synced {len(data)} cryptocurrencies to stocks table"}
+    return {"message": f"Successfully synced {len(data)} cryptocurrencies to stocks table", **summary}
 
 
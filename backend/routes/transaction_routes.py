@@ -1,43 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from backend.database.db import get_db
+from datetime import datetime
+from typing import Literal, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Date, case, cast, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.db import AsyncSessionLocal, get_async_db
 from backend.middleware.logs import logger
 from backend.models.transaction import Transaction
 from backend.models.stock import Stocks
-from backend.models.users import Users
-from backend.schemas.transaction_schema import Transaction_create, TransactionResponse
+from backend.common.pagination import NEXT_CURSOR_HEADER, STREAM_BATCH_SIZE, decode_cursor, encode_cursor, ndjson_line
+from backend.common.price_refresher import price_refresher
+from backend.common.shared_prices import current_price
+from backend.common.trading import execute_batch, execute_trade
+from backend.config.config import settings
+from backend.schemas.transaction_schema import (
+    Transaction_create, TransactionAggregate, TransactionBatchCreate, TransactionBatchResponse, TransactionResponse
+)
 
 router = APIRouter()
 
 
-def calculate_user_holdings(db: Session, user_id: int, stock_id: int) -> int:
+from backend.common.security import Principal, get_current_principal
+
+
+async def _resolve_stocks(db: AsyncSession, tickers: set[str]) -> dict[str, Stocks]:
     """
-    Calculate the user's current holdings for a specific stock.
-    Returns the net number of units (BUY - SELL).
+    Look up stocks by (upper-case) ticker in one query. When some are missing and no background
+    refresh keeps the stocks table synced, sync once from the crypto data and look them up again.
+    Tickers that still cannot be found are left out of the result.
     """
-    # Get all transactions for this user and stock
-    transactions = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.ticker_id == stock_id
-    ).all()
-    
-    holdings = 0
-    for trans in transactions:
-        if trans.transaction_type.upper() == "BUY":
-            holdings += trans.transaction_volume
-        elif trans.transaction_type.upper() == "SELL":
-            holdings -= trans.transaction_volume
-    
-    return max(0, holdings)  # Ensure non-negative
-
-
-from backend.common.security import get_current_user
+    stock_query = select(Stocks).where(Stocks.ticker.in_(tickers))
+    stocks = {stock.ticker: stock for stock in (await db.execute(stock_query)).scalars()}
+    if len(stocks) < len(tickers) and not price_refresher.keeps_stocks_synced:
+        from backend.routes.stock_routes import fetch_crypto_data, sync_crypto_to_stocks
+        logger.info("Tickers %s not found, attempting auto-sync...", sorted(tickers - stocks.keys()))
+        try:
+            # Fetch 250 coins to be safe
+            crypto_data = await fetch_crypto_data("usd", count=250)
+            await db.run_sync(lambda session: sync_crypto_to_stocks(crypto_data, session))
+            stocks = {stock.ticker: stock for stock in (await db.execute(stock_query)).scalars()}
+        except Exception as e:
+            logger.error("Auto-sync failed: %s", e)
+    return stocks
 
 @router.post("/transactions", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
 async def create_transaction(
         transaction: Transaction_create,
-        db: Session = Depends(get_db),
-        current_user: Users = Depends(get_current_user)
+        db: AsyncSession = Depends(get_async_db),
+        principal: Principal = Depends(get_current_principal)
 ):
     """
     Creates a new transaction (buy/sell stocks), checks balance and holdings, updates accordingly.
@@ -48,59 +59,17 @@ async def create_transaction(
     if transaction.transaction_type.upper() not in ["BUY", "SELL"]:
         raise HTTPException(status_code=400, detail="Transaction type must be BUY or SELL")
 
-    stock = db.query(Stocks).filter(Stocks.ticker == transaction.ticker.upper()).first()
-    if not stock:
-        # Ticker not in database, attempt to sync from crypto data first
-        from backend.routes.stock_routes import fetch_crypto_data, sync_crypto_to_stocks
-        logger.info(f"Ticker {transaction.ticker} not found, attempting auto-sync...")
-        try:
-            # Fetch 250 coins to be safe
-            crypto_data = fetch_crypto_data("usd", count=250)
-            sync_crypto_to_stocks(crypto_data, db)
-            # Try finding it again
-            stock = db.query(Stocks).filter(Stocks.ticker == transaction.ticker.upper()).first()
-        except Exception as e:
-            logger.error(f"Auto-sync failed: {str(e)}")
-            
+    ticker = transaction.ticker.upper()
+    stock = (await _resolve_stocks(db, {ticker})).get(ticker)
     if not stock:
         raise HTTPException(status_code=404, detail=f"Stock/Token '{transaction.ticker}' not found. Please ensure the ticker is correct.")
 
-    # Use the authenticated user
-    user = current_user
-
-    transaction_price = stock.stock_price * transaction.transaction_volume
-
-    if transaction.transaction_type.upper() == 'BUY':
-        # Check if user has enough balance
-        if user.balance < transaction_price:
-            raise HTTPException(status_code=400, detail="Insufficient balance")
-        user.balance -= transaction_price
-        
-    elif transaction.transaction_type.upper() == 'SELL':
-        # Calculate user's current holdings for this stock
-        user_holdings = calculate_user_holdings(db, user.id, stock.id)
-        
-        if user_holdings < transaction.transaction_volume:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Insufficient holdings. You only have {user_holdings} units of {stock.ticker}"
-            )
-        
-        user.balance += transaction_price
-
-    logger.info(f"{transaction.transaction_type} Transaction is created for: {user.username}")
-
-    new_transaction = Transaction(
-        user_id=user.id,
-        ticker_id=stock.id,
-        transaction_price=transaction_price,
-        transaction_volume=transaction.transaction_volume,
-        transaction_type=transaction.transaction_type.upper()
-    )
-
-    db.add(new_transaction)
-    db.commit()
-    db.refresh(new_transaction)
+    # Balance, position and ledger are written together and retried if another order for this user wins
+    new_transaction, user = await execute_trade(db, principal.id, stock, transaction.transaction_type,
+                                                transaction.transaction_volume,
+                                                price=current_price(ticker, stock.stock_price))
+    # id and created_time were fetched with the INSERT (eager_defaults), no refresh needed
+    logger.info("%s Transaction is created for: %s", new_transaction.transaction_type, user.username)
 
     response = TransactionResponse(
         id=new_transaction.id,
@@ -109,90 +78,227 @@ async def create_transaction(
         transaction_price=new_transaction.transaction_price,
         created_time=new_transaction.created_time,
         username=user.username,
-        ticker=stock.ticker
+        ticker=ticker
     )
 
     return response
 
 
+@router.post("/transactions/batch", response_model=TransactionBatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_transactions_batch(
+        batch: TransactionBatchCreate,
+        db: AsyncSession = Depends(get_async_db),
+        principal: Principal = Depends(get_current_principal)
+):
+    """
+    Executes several buy/sell orders in one database transaction, e.g. to rebalance a portfolio.
+    Either every order is applied or none is. Results are returned in the order given.
+    """
+    if len(batch.orders) > settings.TRADE_BATCH_MAX_ORDERS:
+        raise HTTPException(status_code=400,
+                            detail=f"A batch can hold at most {settings.TRADE_BATCH_MAX_ORDERS} orders")
+
+    for index, order in enumerate(batch.orders):
+        if order.transaction_volume <= 0:
+            raise HTTPException(status_code=400, detail=f"Order {index}: Volume must be greater than 0")
+        if order.transaction_type.upper() not in ["BUY", "SELL"]:
+            raise HTTPException(status_code=400, detail=f"Order {index}: Transaction type must be BUY or SELL")
+
+    # Resolve every ticker in one query
+    tickers = {order.ticker.upper() for order in batch.orders}
+    stocks = await _resolve_stocks(db, tickers)
+
+    missing = sorted(tickers - stocks.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Stock/Token not found: {', '.join(missing)}")
+
+    orders = []
+    for order in batch.orders:
+        ticker = order.ticker.upper()
+        stock = stocks[ticker]
+        orders.append((stock.id, ticker, order.transaction_type, order.transaction_volume,
+                       current_price(ticker, stock.stock_price)))
+
+    transactions, user = await execute_batch(db, principal.id, orders)
+    logger.info("Batch of %s transactions is created for: %s", len(transactions), user.username)
+
+    return TransactionBatchResponse(
+        balance=user.balance,
+        transactions=[
+            TransactionResponse(**_transaction_row(
+                transaction.id,
+                transaction.transaction_volume,
+                transaction.transaction_type,
+                transaction.transaction_price,
+                transaction.created_time,
+                user.username,
+                ticker
+            ))
+            for transaction, (_, ticker, *_) in zip(transactions, orders)
+        ]
+    )
+
+
+def _transaction_row(transaction_id, volume, transaction_type, price, created_time, username, ticker) -> dict:
+    return {
+        "id": transaction_id,
+        "transaction_volume": volume,
+        "transaction_type": transaction_type,
+        "transaction_price": price,
+        "created_time": created_time,
+        "username": username,
+        "ticker": ticker,
+    }
+
+
+def _transactions_query(user_id: int):
+    """Select only the columns the response needs, with the ticker joined in."""
+    return select(
+        Transaction.id,
+        Transaction.transaction_volume,
+        Transaction.transaction_type,
+        Transaction.transaction_price,
+        Transaction.created_time,
+        Stocks.ticker
+    ).join(Stocks, Stocks.id == Transaction.ticker_id)\
+     .where(Transaction.user_id == user_id)\
+     .order_by(Transaction.id)
+
+
+async def _stream_transactions(user_id: int, username: str):
+    """Yield the user's history as NDJSON, fetching rows in batches on a dedicated session."""
+    async with AsyncSessionLocal() as session:
+        query = _transactions_query(user_id).execution_options(yield_per=STREAM_BATCH_SIZE)
+        result = await session.stream(query)
+        async for row in result:
+            yield ndjson_line(_transaction_row(*row[:5], username, row[5]))
+
+
 @router.get("/transactions/{username}", response_model=list[TransactionResponse],
             status_code=status.HTTP_200_OK)
 async def get_transactions_by_username(
     username: str, 
-    db: Session = Depends(get_db),
-    current_user: Users = Depends(get_current_user)
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
+    """
+    Returns the user's transactions ordered by id.
+    With `limit`, returns one page and puts the cursor for the next page in the
+    X-Next-Cursor header. With `stream=true`, streams the full history as NDJSON.
+    """
     # Authorization check
     if current_user.username != username:
         raise HTTPException(status_code=403, detail="Not authorized to view these transactions")
-        
-    user = db.query(Users).filter(Users.username == username).first()
-    logger.info(f"Fetching transactions data for user: {username}")
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    transactions = db.query(Transaction).filter(Transaction.user_id == user.id).all()
-
-    if not transactions:
-        # Return empty list instead of 404 to avoid frontend errors on empty history
-        return []
-
-    response = [
-        TransactionResponse(
-            id=transaction.id,
-            transaction_volume=transaction.transaction_volume,
-            transaction_type=transaction.transaction_type,
-            transaction_price=transaction.transaction_price,
-            created_time=transaction.created_time,
-            username=user.username,
-            ticker=transaction.ticker.ticker
-        )
+
+    # The authenticated principal is the requested user, no need to load the row again
+    user = current_user
+    logger.info("Fetching transactions data for user: %s", username)
+
+    if stream:
+        return StreamingResponse(_stream_transactions(user.id, user.username), media_type="application/x-ndjson")
+
+    query = _transactions_query(user.id)
+    if cursor is not None:
+        (last_id,) = decode_cursor(cursor, 1)
+        query = query.where(Transaction.id > last_id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    transactions = (await db.execute(query)).all()
+
+    if limit is not None and len(transactions) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(transactions[-1].id)
+
+    # Return empty list instead of 404 to avoid frontend errors on empty history
+    return [
+        _transaction_row(*transaction[:5], user.username, transaction[5])
         for transaction in transactions
     ]
 
-    return response
 
 
-#
-# @router.get("/transactions/{username}/{start_time}/{end_time}/", response_model=list[TransactionResponse])
-# async def get_transactions_by_time(
-#         username: str,
-#         start_time: str,
-#         end_time: str,
-#         db: Session = Depends(get_db)):
-#
-#     user = db.query(Users).filter(Users.username == username).first()
-#     if not user:
-#         raise HTTPException(status_code=404, detail="User not found")
-#
-#     try:
-#         start_date = datetime.strptime(start_time, "%Y-%m-%d")
-#         end_date = datetime.strptime(end_time, "%Y-%m-%d")
-#     except ValueError:
-#         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
-#
-#     transactions = db.query(
-#         Transaction,
-#         Users.username,
-#         Stocks.ticker
-#     ).join(Users, Users.id == Transaction.user_id).join(Stocks, Stocks.id == Transaction.ticker_id).filter(
-#         Transaction.user_id == user.id,
-#         Transaction.created_time.between(start_date, end_date)
-#     ).all()
-#
-#     if not transactions:
-#         return JSONResponse(content={"message": "No transactions found"}, status_code=200)
-#
-#     response = [
-#         {
-#             "id": transaction.id,
-#             "user_id": transaction.user_id,
-#             "amount": transaction.amount,
-#             "created_time": transaction.created_time,
-#             "username": username,
-#             "ticker": ticker
-#         }
-#         for transaction, username, ticker in transactions
-#     ]
-#     return response
+def _bucket_expression(group_by: str, dialect_name: str):
+    """SQL expression that maps a transaction to its aggregation bucket."""
+    if group_by == "ticker":
+        return Stocks.ticker
+    if dialect_name == "postgresql":
+        # Inline the unit so SELECT and GROUP BY render identical expressions
+        return cast(func.date_trunc(literal_column(f"'{group_by}'"), Transaction.created_time), Date)
+    if group_by == "day":
+        return func.date(Transaction.created_time)
+    # SQLite: step forward to Sunday, then back to that week's Monday (matches date_trunc('week'))
+    return func.date(Transaction.created_time, "weekday 0", "-6 days")
+
+
+@router.get("/transactions/{username}/range",
+            response_model=Union[list[TransactionResponse], list[TransactionAggregate]],
+            status_code=status.HTTP_200_OK)
+async def get_transactions_by_time(
+    username: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    group_by: Literal["day", "week", "ticker"] | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Returns the user's transactions with start <= created_time < end, served by
+    the (user_id, created_time) index. With `group_by`, returns buy/sell volume
+    and notional per day, week or ticker, aggregated in SQL.
+    """
+    if current_user.username != username:
+        raise HTTPException(status_code=403, detail="Not authorized to view these transactions")
+
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    logger.info("Fetching transactions for user: %s between %s and %s", username, start, end)
+
+    conditions = [Transaction.user_id == current_user.id]
+    if start is not None:
+        conditions.append(Transaction.created_time >= start)
+    if end is not None:
+        conditions.append(Transaction.created_time < end)
+
+    if group_by is None:
+        query = _transactions_query(current_user.id).where(*conditions[1:])\
+            .order_by(None).order_by(Transaction.created_time, Transaction.id)
+        transactions = (await db.execute(query)).all()
+        return [
+            _transaction_row(*transaction[:5], current_user.username, transaction[5])
+            for transaction in transactions
+        ]
+
+    is_buy = Transaction.transaction_type == 'BUY'
+    is_sell = Transaction.transaction_type == 'SELL'
+    bucket = _bucket_expression(group_by, db.get_bind().dialect.name).label("bucket")
+    query = select(
+        bucket,
+        func.sum(case((is_buy, Transaction.transaction_volume), else_=0)).label("buy_volume"),
+        func.sum(case((is_sell, Transaction.transaction_volume), else_=0)).label("sell_volume"),
+        func.sum(case((is_buy, Transaction.transaction_price), else_=0)).label("buy_notional"),
+        func.sum(case((is_sell, Transaction.transaction_price), else_=0)).label("sell_notional"),
+        func.count(Transaction.id).label("trade_count")
+    ).select_from(Transaction)\
+     .where(*conditions)\
+     .group_by(bucket)\
+     .order_by(bucket)
+    if group_by == "ticker":
+        query = query.join(Stocks, Stocks.id == Transaction.ticker_id)
+
+    rows = (await db.execute(query)).all()
+    return [
+        TransactionAggregate(
+            bucket=row.bucket if isinstance(row.bucket, str) else row.bucket.isoformat(),
+            buy_volume=row.buy_volume,
+            sell_volume=row.sell_volume,
+            buy_notional=row.buy_notional,
+            sell_notional=row.sell_notional,
+            trade_count=row.trade_count
+        )
+        for row in rows
+    ]
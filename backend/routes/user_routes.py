@@ -1,10 +1,13 @@
 from backend.middleware.logs import logger
 from fastapi import APIRouter, HTTPException, status, Depends
+from sqlalchemy import func, select, update
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from backend.models.users import Users
-from backend.schemas.user_schema import UserCreate, UserResponse
-from backend.database.db import get_db
+from backend.schemas.user_schema import (
+    PnlResponse, PortfolioHolding, PortfolioResponse, TickerPnl, UserCreate, UserResponse
+)
+from backend.database.db import get_async_db
 
 router = APIRouter()
 
@@ -14,8 +17,16 @@ def index():
     return {"message": "<<<<< Welcome to the stock app >>>>>"}
 
 
+@router.get("/api/auth/stats")
+def get_auth_stats():
+    """
+    Reports the password hashing pool's load, rejections and rehashes.
+    """
+    return password_hasher.stats()
+
+
 from datetime import timedelta
-from backend.common.security import get_password_hash, verify_password, create_access_token, get_current_user
+from backend.common.security import Principal, password_hasher, create_access_token, get_current_principal
 from backend.config.config import settings
 from pydantic import BaseModel
 
@@ -29,18 +40,18 @@ class Token(BaseModel):
     username: str
 
 @router.post("/register")
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    logger.info(f"User registration attempt for: {user.username}")
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    logger.info("User registration attempt for: %s", user.username)
 
-    existing_user = db.query(Users).filter_by(username=user.username).first()
+    existing_user = (await db.execute(select(Users).filter_by(username=user.username))).scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
 
     if user.balance <= 0:
         raise HTTPException(status_code=400, detail="Balance must be greater than zero")
 
-    # Hash the password
-    hashed_pwd = get_password_hash(user.password)
+    # Hash the password off the event loop
+    hashed_pwd = await password_hasher.hash(user.password)
 
     new_user = Users(
         username=user.username,
@@ -50,8 +61,8 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
     try:
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         return {
             "message": "User created successfully",
             "user_id": new_user.id,
@@ -59,17 +70,30 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
             "balance": new_user.balance
         }
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="An error occurred while creating the user")
 
 
 @router.post("/login", response_model=Token)
-async def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
-    db_user = db.query(Users).filter_by(username=login_data.username).first()
+async def login_user(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(select(Users).filter_by(username=login_data.username))).scalars().first()
     
-    if not db_user or not verify_password(login_data.password, db_user.hashed_password):
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await password_hasher.verify_and_update(login_data.password, db_user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    if new_hash is not None:
+        # The configured bcrypt cost changed since this password was hashed. Written without
+        # the version check, a trade committed while bcrypt ran must not fail the login.
+        await db.execute(
+            update(Users).where(Users.id == db_user.id).values(hashed_password=new_hash)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": db_user.username}, expires_delta=access_token_expires
@@ -82,16 +106,14 @@ async def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 
-from backend.models.transaction import Transaction
+from backend.models.position import Position
 from backend.models.stock import Stocks
 
-from sqlalchemy import func, case
-
 @router.get("/users/{username}", response_model=UserResponse, status_code=status.HTTP_200_OK)
 async def get_user(
     username: str, 
-    db: Session = Depends(get_db),
-    current_user: Users = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Retrieves user details by username, including their calculated holdings.
@@ -100,37 +122,154 @@ async def get_user(
     if current_user.username != username:
         raise HTTPException(status_code=403, detail="Not authorized to view this profile")
 
-    logger.info(f"Fetching full user data and holdings for: {username}")
+    logger.info("Fetching full user data and holdings for: %s", username)
 
-    user = db.query(Users).filter(Users.username == username).first()
+    # Identity comes from the principal cache, the balance is read with the holdings
+    user = current_user
+
+    # Holdings are maintained incrementally in the positions table, outer joined so a
+    # user without holdings still gets one row carrying the balance
+    holdings_query = select(
+        Users.balance,
+        Stocks.ticker,
+        Position.net_volume
+    ).select_from(Users)\
+     .outerjoin(Position, (Position.user_id == Users.id) & (Position.net_volume > 0))\
+     .outerjoin(Stocks, Stocks.id == Position.stock_id)\
+     .where(Users.id == user.id)
 
-    if not user:
+    results = (await db.execute(holdings_query)).all()
+    if not results:
         raise HTTPException(status_code=404, detail="User not found")
+    balance = results[0].balance
 
-    # Optimized holdings calculation using SQL aggregation
-    holdings_query = db.query(
-        Stocks.ticker,
-        func.sum(
-            case(
-                (Transaction.transaction_type == 'BUY', Transaction.transaction_volume),
-                (Transaction.transaction_type == 'SELL', -Transaction.transaction_volume),
-                else_=0
-            )
-        ).label("net_volume")
-    ).join(Stocks, Stocks.id == Transaction.ticker_id)\
-     .filter(Transaction.user_id == user.id)\
-     .group_by(Stocks.ticker)
-     
-    results = holdings_query.all()
-    
     # Create holdings dict, filtering out zero/negative balances
-    holdings = {ticker: volume for ticker, volume in results if volume > 0}
+    holdings = {ticker: volume for _, ticker, volume in results if ticker is not None and volume > 0}
     
-    logger.info(f"Calculated holdings for {username}: {holdings}")
+    # The full holdings dict is only worth writing when debugging
+    logger.debug("Calculated holdings for %s: %s", username, holdings)
 
     return UserResponse(
         id=user.id, 
         username=user.username, 
-        balance=user.balance,
+        balance=balance,
         holdings=holdings
     )
+
+
+@router.get("/users/{username}/portfolio", response_model=PortfolioResponse, status_code=status.HTTP_200_OK)
+async def get_portfolio(
+    username: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Values the user's holdings at current prices.
+    One query joins positions with stocks, so the response grows with the number of
+    tickers held rather than with the length of the transaction history. The trade count
+    is summed from the per-position counters for the same reason.
+    """
+    if current_user.username != username:
+        raise HTTPException(status_code=403, detail="Not authorized to view this portfolio")
+
+    logger.info("Valuing portfolio for: %s", username)
+
+    # Outer joined from users so the balance comes with the holdings, even when there are none
+    market_value = (Position.net_volume * Stocks.stock_price).label("market_value")
+    trade_count = select(func.coalesce(func.sum(Position.trade_count), 0))\
+        .where(Position.user_id == Users.id)\
+        .correlate(Users)\
+        .scalar_subquery()
+    portfolio_query = select(
+        Users.balance,
+        trade_count.label("trade_count"),
+        Stocks.ticker,
+        Stocks.stock_name,
+        Stocks.stock_price,
+        Position.net_volume,
+        Position.cost_basis,
+        Position.realized_pnl,
+        market_value
+    ).select_from(Users)\
+     .outerjoin(Position, (Position.user_id == Users.id) & (Position.net_volume > 0))\
+     .outerjoin(Stocks, Stocks.id == Position.stock_id)\
+     .where(Users.id == current_user.id)\
+     .order_by(market_value.desc())
+
+    rows = (await db.execute(portfolio_query)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="User not found")
+    balance, trade_count = rows[0].balance, rows[0].trade_count
+
+    holdings = [
+        PortfolioHolding(
+            ticker=ticker,
+            stock_name=stock_name,
+            quantity=quantity,
+            current_price=price,
+            market_value=value,
+            average_cost=cost_basis / quantity,
+            cost_basis=cost_basis,
+            unrealized_pnl=value - cost_basis,
+            realized_pnl=realized_pnl
+        )
+        for _, _, ticker, stock_name, price, quantity, cost_basis, realized_pnl, value in rows
+        if ticker is not None
+    ]
+
+    holdings_value = sum(holding.market_value for holding in holdings)
+    return PortfolioResponse(
+        username=current_user.username,
+        balance=balance,
+        holdings=holdings,
+        holdings_value=holdings_value,
+        total_equity=balance + holdings_value,
+        trade_count=trade_count
+    )
+
+
+@router.get("/users/{username}/pnl", response_model=PnlResponse, status_code=status.HTTP_200_OK)
+async def get_pnl(
+    username: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """
+    Returns realized and unrealized P&L per ticker, including tickers no longer held.
+    Realized P&L is recorded FIFO as sells happen, and unrealized P&L is the open lots'
+    cost (kept in positions.cost_basis) against the current price, so no ledger replay is needed.
+    """
+    if current_user.username != username:
+        raise HTTPException(status_code=403, detail="Not authorized to view this portfolio")
+
+    pnl_query = select(
+        Stocks.ticker,
+        Stocks.stock_price,
+        Position.net_volume,
+        Position.cost_basis,
+        Position.realized_pnl
+    ).join(Stocks, Stocks.id == Position.stock_id)\
+     .where(Position.user_id == current_user.id, (Position.net_volume > 0) | (Position.realized_pnl != 0))\
+     .order_by(Stocks.ticker)
+
+    tickers = [
+        TickerPnl(
+            ticker=ticker,
+            quantity=quantity,
+            average_cost=cost_basis / quantity if quantity > 0 else 0,
+            current_price=price,
+            realized_pnl=realized_pnl,
+            unrealized_pnl=quantity * price - cost_basis
+        )
+        for ticker, price, quantity, cost_basis, realized_pnl in await db.execute(pnl_query)
+    ]
+
+    realized = sum(entry.realized_pnl for entry in tickers)
+    unrealized = sum(entry.unrealized_pnl for entry in tickers)
+    return PnlResponse(
+        username=current_user.username,
+        tickers=tickers,
+        realized_pnl=realized,
+        unrealized_pnl=unrealized,
+        total_pnl=realized + unrealized
+    )
@@ -9,6 +9,10 @@ class Transaction_create(BaseModel):
     transaction_type: str
 
 
+class TransactionBatchCreate(BaseModel):
+    orders: list[Transaction_create] = Field(..., min_length=1)
+
+
 class TransactionResponse(BaseModel):
     id: int
     transaction_volume: float
@@ -22,6 +26,11 @@ class TransactionResponse(BaseModel):
         from_attributes = True
 
 
+class TransactionBatchResponse(BaseModel):
+    balance: float
+    transactions: list[TransactionResponse]
+
+
 class TransactionResponsetime(BaseModel):
     id: int
     username: str
@@ -30,3 +39,12 @@ class TransactionResponsetime(BaseModel):
     quantity: int
     price: float
     created_at: datetime
+
+
+class TransactionAggregate(BaseModel):
+    bucket: str
+    buy_volume: float
+    sell_volume: float
+    buy_notional: float
+    sell_notional: float
+    trade_count: int
@@ -15,3 +15,41 @@ class UserResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class PortfolioHolding(BaseModel):
+    ticker: str
+    stock_name: str
+    quantity: float
+    current_price: float
+    market_value: float
+    average_cost: float
+    cost_basis: float
+    unrealized_pnl: float
+    realized_pnl: float
+
+
+class PortfolioResponse(BaseModel):
+    username: str
+    balance: float
+    holdings: list[PortfolioHolding] = []
+    holdings_value: float
+    total_equity: float
+    trade_count: int
+
+
+class TickerPnl(BaseModel):
+    ticker: str
+    quantity: float
+    average_cost: float
+    current_price: float
+    realized_pnl: float
+    unrealized_pnl: float
+
+
+class PnlResponse(BaseModel):
+    username: str
+    tickers: list[TickerPnl] = []
+    realized_pnl: float
+    unrealized_pnl: float
+    total_pnl: float
@@ -0,0 +1,23 @@
+import argparse
+
+from backend.database.db import SessionLocal
+from backend.common.positions import rebuild_positions
+import backend.models  # Ensure all models are loaded before querying
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the positions and lots tables from the transactions ledger.")
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild positions for this user")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Ledger rows fetched per round trip")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = rebuild_positions(db, user_id=args.user_id, batch_size=args.batch_size)
+        print(f"Rebuilt {count} positions")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,83 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from starlette.middleware.cors import CORSMiddleware
 
-from backend.routes import stock_routes, user_routes, transaction_routes
+from backend.config.config import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from backend.common.coingecko import coingecko_client
+    from backend.common.price_feed import price_feed
+    from backend.common.price_refresher import price_refresher
+    from backend.common.security import password_hasher
+    from backend.common import shared_prices
+    from backend.database.db import dispose_engines, get_async_engine, get_engine
+    from backend.middleware.metrics import instrument_engine
+
+    # Engines are created here rather than at import, so importing the app stays cheap
+    instrument_engine(get_engine())
+    instrument_engine(get_async_engine().sync_engine)
+    if settings.SHARED_PRICES_NAME:
+        # Started by backend.scripts.serve, its updater process fetches prices for every worker
+        shared_prices.attach(settings.SHARED_PRICES_NAME)
+    elif settings.PRICE_REFRESH_ENABLED:
+        price_refresher.start()
+    yield
+    await price_refresher.stop()
+    await price_feed.stop()
+    password_hasher.shutdown()
+    shared_prices.detach()
+    # Release the pooled upstream and database connections
+    await coingecko_client.aclose()
+    await dispose_engines()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Routers (and with them the models and clients) are imported
+    here, so processes that only import this module, such as Celery workers or scripts,
+    do not pay for them.
+
+        uvicorn backend.scripts.run:create_app --factory
+    """
+    from backend.middleware.metrics import PrometheusMiddleware, metrics_endpoint
+    from backend.routes import stock_routes, user_routes, transaction_routes
+
+    app = FastAPI(lifespan=lifespan)
+
+    origins = [
+     "http://localhost:3000",
+    ]
+    app.add_middleware(
+     CORSMiddleware,
+     allow_origins=origins,
+     allow_credentials=True,
+     allow_methods=["*"],
+     allow_headers=["*"],
+     expose_headers=["X-Next-Cursor"],
+
+    )
+    app.add_middleware(PrometheusMiddleware)
 
-app = FastAPI()
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
-origins = [
- "http://localhost:3000",
-]
-app.add_middleware(
- CORSMiddleware,
- allow_origins=origins,
- allow_credentials=True,
- allow_methods=["*"],
- allow_headers=["*"],
+    app.include_router(user_routes.router)
+    app.include_router(stock_routes.router)
+    app.include_router(transaction_routes.router)
+    return app
 
-)
 
-app.include_router(user_routes.router)
-app.include_router(stock_routes.router)
-app.include_router(transaction_routes.router)
+_app: FastAPI | None = None
 
 
+def __getattr__(name: str):
+    # `backend.scripts.run:app` keeps working, the app is built on first access
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
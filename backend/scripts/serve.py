@@ -0,0 +1,184 @@
+"""
+Pre-forking launcher for several uvicorn workers sharing one quote table.
+
+The app is built once in this process before forking. One updater process runs the price
+refresher, writing every snapshot into a shared memory segment and syncing the stocks
+table, and each worker reads prices from that segment without locks or copies instead of
+polling the upstream itself. Workers accept from one listening socket and are restarted
+if they exit. Metrics run in prometheus multiprocess mode, so a scrape of /metrics on
+any worker reports the counters of all of them.
+
+    python -m backend.scripts.serve --workers 4 --host 0.0.0.0 --port 8000
+"""
+import argparse
+import glob
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+import traceback
+
+# A worker that exits sooner than this after starting is restarted after a pause
+MIN_UPTIME_SECONDS = 1.0
+
+
+def run_worker(app, sock: socket.socket, args):
+    import uvicorn
+
+    config = uvicorn.Config(app, log_level=args.log_level, access_log=not args.no_access_log,
+                            timeout_graceful_shutdown=args.graceful_timeout)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def run_updater(table):
+    import asyncio
+
+    async def update():
+        from backend.common.coingecko import coingecko_client
+        from backend.common.price_refresher import price_refresher
+        from backend.database.db import dispose_engines
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+
+        price_refresher.shared_table = table
+        price_refresher.start()
+        await stop.wait()
+        await price_refresher.stop()
+        await coingecko_client.aclose()
+        await dispose_engines()
+
+    asyncio.run(update())
+
+
+def spawn(target, *args) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 0
+    try:
+        from backend.middleware.logs import use_process_log_file
+
+        use_process_log_file()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        target(*args)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        # Never return into the parent's loop
+        os._exit(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several uvicorn workers with a shared quote table.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true")
+    parser.add_argument("--graceful-timeout", type=float, default=30, help="Seconds workers get to finish requests")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    # Settings are read on import, so the workers' table name has to be in place first
+    os.environ.setdefault("SHARED_PRICES_NAME", f"prices_{os.getpid()}")
+    # prometheus_client picks its multiprocess storage on import, so this also comes first
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    own_metrics_dir = metrics_dir is None
+    if own_metrics_dir:
+        metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="metrics_")
+    else:
+        # Samples left by an earlier run would be added to this one's
+        for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+            os.remove(path)
+    from backend.config.config import settings
+    from backend.common.shared_prices import SharedPriceTable
+    from prometheus_client import multiprocess
+    from backend.middleware.logs import logger
+    from backend.scripts.run import create_app
+
+    table = None
+    if settings.PRICE_REFRESH_ENABLED:
+        table = SharedPriceTable.create(settings.SHARED_PRICES_NAME, settings.SHARED_PRICES_CAPACITY)
+    else:
+        # Nothing would write to the table, workers fall back to fetching on demand
+        settings.SHARED_PRICES_NAME = ""
+
+    # Routers, models and clients are imported once here and shared copy-on-write by the workers
+    app = create_app()
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    # pid -> (role, started)
+    children: dict[int, tuple[str, float]] = {}
+
+    def start(role: str):
+        pid = spawn(run_updater, table) if role == "updater" else spawn(run_worker, app, sock, args)
+        children[pid] = (role, time.monotonic())
+
+    try:
+        if table is not None:
+            start("updater")
+        for _ in range(args.workers):
+            start("worker")
+        logger.info("Serving on %s:%s with %s workers, quote table %s", args.host, args.port, args.workers,
+                    table.name if table is not None else None)
+
+        while not stopping:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                time.sleep(0.2)
+                continue
+            if pid not in children:
+                continue
+            role, started = children.pop(pid)
+            # Drop its live gauges, e.g. requests in progress
+            multiprocess.mark_process_dead(pid)
+            logger.warning("%s %s exited with status %s, restarting", role.capitalize(), pid,
+                           os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < MIN_UPTIME_SECONDS:
+                time.sleep(MIN_UPTIME_SECONDS)
+            if not stopping:
+                start(role)
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + args.graceful_timeout + 5
+        while children and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                children.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in children:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        sock.close()
+        if table is not None:
+            table.close()
+        if own_metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()